@@ -0,0 +1,122 @@
+# backend/aliases.py
+"""
+Kesintisiz yeniden index (blue/green) için Milvus koleksiyon alias'ları.
+
+ingest.py her çalıştırmada <alias>_v<YYYYMMDDHHMMSS> adında yeni bir koleksiyon kurar,
+index'ini oluşturup yükler, sonra alias'ı (COLLECTION_NAME, ör. rules_qa) atomik olarak yeni
+koleksiyona çevirir. Backend alias'ı gerçek koleksiyon adına çözer ve değişikliği arka planda
+fark edip yeniden başlatmadan geçer (bkz. backend/app.py, INDEX_WATCH_SECONDS).
+
+Son INDEX_KEEP_VERSIONS sürüm yüklü tutulur: geri dönüş (rollback) anında olur, geçişi henüz
+fark etmemiş worker'lar da eski sürümden cevap vermeye devam eder.
+"""
+import os
+import re
+import time
+import random
+from typing import List, Optional, Tuple
+
+from pymilvus import Collection, DataType, utility
+
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))
+DEFAULT_COLLECTION = "rules_qa"
+
+VECTOR_TYPES = (DataType.FLOAT_VECTOR, DataType.FLOAT16_VECTOR)
+
+
+def collection_setting() -> str:
+    """
+    ingest.py, backend ve manage.py'nin ortak alias / koleksiyon adı. MILVUS_COLLECTION (ingest) ile
+    COLLECTION_NAME (backend) aynı ayarın iki adıdır; farklı değerlerle verilirse ingest bir alias'ı
+    çevirip backend başkasını izlerdi -> başlangıçta hata.
+    """
+    milvus_collection = os.getenv("MILVUS_COLLECTION", "").strip()
+    collection_name = os.getenv("COLLECTION_NAME", "").strip()
+    if milvus_collection and collection_name and milvus_collection != collection_name:
+        raise RuntimeError(
+            f"MILVUS_COLLECTION='{milvus_collection}' ile COLLECTION_NAME='{collection_name}' farklı. "
+            "İkisi aynı koleksiyonu (alias'ı) gösterir; birini kaldır ya da eşitle."
+        )
+    return milvus_collection or collection_name or DEFAULT_COLLECTION
+
+
+def new_version_name(alias: str) -> str:
+    return f"{alias}_v{time.strftime('%Y%m%d%H%M%S')}"
+
+
+def list_versions(alias: str) -> List[str]:
+    pattern = re.compile(re.escape(alias) + r"_v\d{14}$")
+    return sorted(n for n in utility.list_collections() if pattern.match(n))
+
+
+def resolve(alias: str) -> Optional[str]:
+    """Alias'ın gösterdiği koleksiyon; alias yoksa ama aynı adda koleksiyon varsa kendisi, hiçbiri yoksa None."""
+    if not utility.has_collection(alias):
+        return None
+    return Collection(alias).describe().get("collection_name") or alias
+
+
+def is_legacy(alias: str) -> bool:
+    # alias'lardan önceki kurulum: COLLECTION_NAME adında gerçek bir koleksiyon
+    return resolve(alias) == alias
+
+
+def warm_up(col: Collection):
+    """Koleksiyonu yükler ve bir deneme araması yapar; ilk gerçek sorgu soğuk yüke denk gelmez."""
+    col.load()
+    field = next(f for f in col.schema.fields if f.dtype in VECTOR_TYPES)
+    dim = int(field.params["dim"])
+    vec = [random.gauss(0.0, 1.0) for _ in range(dim)]
+    if field.dtype == DataType.FLOAT16_VECTOR:
+        import numpy as np
+        vec = np.asarray(vec, dtype=np.float16)
+    col.search(data=[vec], anns_field=field.name, param={"metric_type": "IP", "params": {}}, limit=1)
+
+
+def switch_alias(alias: str, target: str, drop_legacy: bool = False) -> Optional[str]:
+    """Alias'ı hedef koleksiyona çevirir (önce yükleyip ısıtır). Önceki koleksiyon adını döner."""
+    current = resolve(alias)
+    if current == target:
+        return current
+
+    warm_up(Collection(target))
+
+    if current == alias:
+        if not drop_legacy:
+            raise RuntimeError(
+                f"'{alias}' alias değil, gerçek bir koleksiyon. Bir kerelik geçiş için "
+                "RESET_COLLECTION=true ile ingest çalıştır (eski koleksiyon silinip alias oluşturulur)."
+            )
+        print(f"🧹 Eski koleksiyon siliniyor (alias'a geçiş): {alias}")
+        utility.drop_collection(alias)
+        current = None
+
+    if current is None:
+        utility.create_alias(target, alias)
+    else:
+        utility.alter_alias(target, alias)
+    print(f"🔀 Alias {alias}: {current} -> {target}")
+    return current
+
+
+def rollback(alias: str) -> Tuple[str, str]:
+    """Alias'ı bir önceki sürüme çevirir -> (önceki, yeni)"""
+    current = resolve(alias)
+    versions = list_versions(alias)
+    if current not in versions or versions.index(current) == 0:
+        raise RuntimeError(f"'{alias}' için geri dönülecek önceki sürüm yok (aktif: {current}).")
+    target = versions[versions.index(current) - 1]
+    switch_alias(alias, target)
+    return current, target
+
+
+def prune_versions(alias: str, keep: int = INDEX_KEEP_VERSIONS) -> List[str]:
+    """En yeni `keep` sürüm ve aktif sürüm dışındakileri siler; silinen adları döner."""
+    current = resolve(alias)
+    versions = list_versions(alias)
+    keep_set = set(versions[-keep:]) if keep > 0 else set()
+    keep_set.add(current)
+    dropped = [v for v in versions if v not in keep_set]
+    for name in dropped:
+        utility.drop_collection(name)
+    return dropped
@@ -2,19 +2,33 @@
 import os
 import time
 import re
+import json
+import hmac
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Header, Request, Response
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
-from openai import OpenAI
-from pymilvus import connections, Collection, utility
+from openai import APITimeoutError
+from pymilvus import connections, Collection, utility, DataType
+
+from backend.embedders import get_embedder
+from backend import aliases, cascade, prefilter, profiler, querylog, recorder, transport, warmup
+from backend.chunk_store import ChunkStore, version_path
+from backend.cache import SQLiteCache, get_cache, normalize_question
+from backend.metrics import metrics
 
 # -----------------------
 # CONFIG
@@ -22,16 +36,37 @@ from pymilvus import connections, Collection, utility
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
 MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
-COLLECTION_NAME = os.getenv("COLLECTION_NAME", "rules_qa")
+COLLECTION_NAME = aliases.collection_setting()  # COLLECTION_NAME / MILVUS_COLLECTION (ingest.py ile ortak)
 VECTOR_FIELD = os.getenv("VECTOR_FIELD", "vector")
 
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
+# ingest.py ile aynı olmalı (başlangıçta koleksiyon şemasıyla karşılaştırılır)
+VECTOR_DIM = int(os.getenv("VECTOR_DIM", "1536"))
+VECTOR_PRECISION = os.getenv("VECTOR_PRECISION", "float32").lower()  # float32 | float16
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "AUTOINDEX").upper()
+VECTOR_INDEX_PARAMS = json.loads(os.getenv("VECTOR_INDEX_PARAMS", "{}"))
+SEARCH_PARAMS = json.loads(os.getenv("SEARCH_PARAMS", '{"nprobe": 10}'))
 CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o-mini")
 TOP_K = int(os.getenv("TOP_K", "3"))
 
 # ✅ Alaka eşiği: düşükse "alakasız" say ve kaynak döndürme
 MIN_SCORE = float(os.getenv("MIN_SCORE", "0.25"))  # 0.20 - 0.35 arası deneyebilirsin
 
+# Yük testi: gerçek Milvus yerine sahte koleksiyon (backend/fakes.py)
+MILVUS_FAKE = os.getenv("MILVUS_FAKE", "false").lower() == "true"
+
+# İki aşamalı retrieval: Milvus sadece id + skor döner, metinler bu yerel depodan okunur (ingest.py yazar)
+CHUNK_STORE_PATH = os.getenv("CHUNK_STORE_PATH", "").strip()
+
+# /chat/batch: en fazla soru sayısı ve aynı anda yapılan LLM çağrısı
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Blue/green: alias'ın gösterdiği koleksiyon bu aralıkla kontrol edilir (0 = kapalı)
+INDEX_WATCH_SECONDS = float(os.getenv("INDEX_WATCH_SECONDS", "15"))
+# /admin/* uçları için X-Admin-Token başlığı; boşsa uçlar kapalı
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "").strip()
+
 # PDF/DOC servis ayarları
 DOCS_DIR = Path(os.getenv("DOCS_DIR", "documents")).resolve()
 DOCS_URL_PREFIX = os.getenv("DOCS_URL_PREFIX", "/docs")  # URL path prefix
@@ -39,7 +74,11 @@ DOCS_URL_PREFIX = os.getenv("DOCS_URL_PREFIX", "/docs")  # URL path prefix
 if not OPENAI_API_KEY:
     raise RuntimeError("OPENAI_API_KEY bulunamadı. .env dosyanı kontrol et.")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# paylaşılan bağlantı havuzu + çağrı türüne göre zaman aşımları (bkz. backend/transport.py)
+client = transport.openai_client("chat")
+
+# EMBED_MODEL: OpenAI modeli | "local:<model_dizini>" | "hash" (bkz. backend/embedders.py)
+embedder = get_embedder(EMBED_MODEL, VECTOR_DIM, client=transport.openai_client("embed"))
 
 # -----------------------
 # FASTAPI
@@ -62,13 +101,24 @@ if DOCS_DIR.exists():
 # -----------------------
 # MILVUS INIT
 # -----------------------
-def init_milvus():
-    connections.connect(alias="default", host=MILVUS_HOST, port=MILVUS_PORT)
-
-    if not utility.has_collection(COLLECTION_NAME):
-        raise RuntimeError(f"'{COLLECTION_NAME}' koleksiyonu bulunamadı. Önce ingest.py çalıştır.")
+VECTOR_DTYPES = {"float32": DataType.FLOAT_VECTOR, "float16": DataType.FLOAT16_VECTOR}
+
+if VECTOR_PRECISION not in VECTOR_DTYPES:
+    raise RuntimeError(f"VECTOR_PRECISION='{VECTOR_PRECISION}' desteklenmiyor (float32 | float16).")
+
+def check_vector_field(col: Collection):
+    # ✅ Sorgu vektörü ile koleksiyon şeması aynı boyut/hassasiyette olmalı
+    field = next(f for f in col.schema.fields if f.name == VECTOR_FIELD)
+    dim = int(field.params.get("dim", 0))
+    if field.dtype != VECTOR_DTYPES[VECTOR_PRECISION] or dim != VECTOR_DIM:
+        raise RuntimeError(
+            f"'{VECTOR_FIELD}' alanı ({field.dtype.name}, dim={dim}) ile ayarlar "
+            f"(VECTOR_PRECISION={VECTOR_PRECISION}, VECTOR_DIM={VECTOR_DIM}) uyuşmuyor. "
+            "ingest.py ile aynı değerleri kullan."
+        )
 
-    col = Collection(COLLECTION_NAME)
+def open_collection(name: str):
+    col = Collection(name)
 
     field_names = {f.name for f in col.schema.fields}
     if VECTOR_FIELD not in field_names:
@@ -77,24 +127,169 @@ def init_milvus():
     if "context" not in field_names:
         raise RuntimeError(f"Koleksiyonda 'context' alanı yok. Alanlar: {sorted(field_names)}")
 
+    check_vector_field(col)
+
     # index yoksa oluştur
     if len(col.indexes) == 0:
         col.create_index(
             field_name=VECTOR_FIELD,
-            index_params={"metric_type": "IP", "index_type": "AUTOINDEX", "params": {}},
+            index_params={"metric_type": "IP", "index_type": VECTOR_INDEX, "params": VECTOR_INDEX_PARAMS},
         )
         while True:
-            progress = utility.index_building_progress(COLLECTION_NAME)
+            progress = utility.index_building_progress(name)
             if progress.get("indexed_rows", 0) == progress.get("total_rows", 1):
                 break
             time.sleep(1)
 
     col.load()
-    has_source = "source" in field_names
-    has_header = "header" in field_names
-    return col, has_source, has_header
+    return col, field_names
+
+def init_milvus():
+    if MILVUS_FAKE:
+        from backend.fakes import FakeCollection
+        return FakeCollection(), {"context", "source", "header"}
+
+    connections.connect(alias="default", host=MILVUS_HOST, port=MILVUS_PORT)
 
-collection, HAS_SOURCE, HAS_HEADER = init_milvus()
+    # COLLECTION_NAME blue/green ingest'te bir alias'tır (backend/aliases.py): gerçek koleksiyona çözülür
+    name = aliases.resolve(COLLECTION_NAME)
+    if name is None:
+        raise RuntimeError(f"'{COLLECTION_NAME}' koleksiyonu bulunamadı. Önce ingest.py çalıştır.")
+    return open_collection(name)
+
+collection, FIELD_NAMES = init_milvus()
+HAS_CATEGORY = "category" in FIELD_NAMES  # partition key (ingest.py)
+
+# sources: dedup ile birleşen kopyaların kaynakları (JSON liste)
+TEXT_FIELDS = [f for f in ("context", "source", "sources", "header") if f in FIELD_NAMES]
+
+def row_count(col) -> int:
+    """Canlı kayıt sayısı. num_entities silinen satırları compaction'a kadar saymaya devam eder."""
+    try:
+        return int(col.query(expr="", output_fields=["count(*)"])[0]["count(*)"])
+    except Exception:
+        return col.num_entities
+
+def collection_id(col) -> Optional[int]:
+    try:
+        return col.describe().get("collection_id")
+    except Exception:
+        return None
+
+def open_chunk_store(col):
+    if not CHUNK_STORE_PATH:
+        return None
+    # blue/green: sürüme ait depo (chunks.<koleksiyon>), yoksa tek depo
+    path = version_path(CHUNK_STORE_PATH, col.name)
+    if not os.path.exists(path + ".idx"):
+        path = CHUNK_STORE_PATH
+    try:
+        store = ChunkStore(path)
+    except FileNotFoundError:
+        print(f"⚠️ CHUNK_STORE_PATH='{CHUNK_STORE_PATH}' bulunamadı; metinler Milvus'tan okunacak.")
+        return None
+    # depo bu koleksiyonun güncel içeriğiyle aynı mı? (aynı ad yeniden oluşturulduysa id farklıdır)
+    stored_id = store.meta.get("collection_id")
+    if (store.meta.get("collection") != col.name
+            or (stored_id is not None and stored_id != collection_id(col))
+            or len(store) != row_count(col)):
+        print(f"⚠️ Parça deposu güncel değil ({store.meta.get('collection')}, {len(store)} kayıt); kullanılmıyor.")
+        store.close()
+        return None
+    return store
+
+chunk_store = open_chunk_store(collection)
+
+# arama yolunun kullandığı (koleksiyon, parça deposu, metin alanları) üçlüsü tek atamayla değişir;
+# istek başında bir kez okunur -> alias geçişi ortasında iki sürüm karışmaz
+active_index = (collection, chunk_store, TEXT_FIELDS)
+
+# embedding'den önce alakasız soruları eleyen yerel n-gram profili (ingest sonunda yazılır)
+domain_profile = prefilter.open_profile(collection.name)
+
+def collection_version(col) -> str:
+    # yeniden ingest -> yeni collection_id ve/veya canlı kayıt sayısı -> yeni sürüm
+    version = f"{col.name}:{collection_id(col)}:{row_count(col)}"
+    # INGEST_VERSION sayım değişmeyen içerik güncellemeleri için ek etikettir, yerine geçmez
+    ingest_version = os.getenv("INGEST_VERSION", "").strip()
+    return f"{ingest_version}:{version}" if ingest_version else version
+
+# embedding / retrieval / cevap önbelleği (CACHE_BACKEND=sqlite ile worker'lar arası paylaşımlı)
+cache = get_cache()
+cache.set_version(collection_version(collection))
+
+# -----------------------
+# BLUE/GREEN: ALIAS TAKİBİ
+# -----------------------
+_switch_lock = threading.Lock()
+
+def activate_collection(col, field_names):
+    """Yeni sürümü bu süreçte devreye alır (koleksiyon, alanlar, parça deposu, önbellek sürümü)."""
+    global collection, FIELD_NAMES, HAS_CATEGORY, TEXT_FIELDS, chunk_store, domain_profile, active_index
+    store = open_chunk_store(col)
+    profile = prefilter.open_profile(col.name)
+    FIELD_NAMES = field_names
+    HAS_CATEGORY = "category" in field_names
+    TEXT_FIELDS = [f for f in ("context", "source", "sources", "header") if f in field_names]
+    # eski depo kapatılmaz: o an okuyan istekler olabilir, referans bırakılınca GC kapatır
+    chunk_store = store
+    domain_profile = profile
+    collection = col
+    active_index = (col, store, TEXT_FIELDS)
+    cache.set_version(collection_version(col))
+
+def refresh_collection() -> bool:
+    """Alias başka bir koleksiyonu gösteriyorsa ona geçer (önce yükleyip ısıtır)."""
+    if MILVUS_FAKE:
+        return False
+    with _switch_lock:
+        name = aliases.resolve(COLLECTION_NAME)
+        if name is None or name == collection.name:
+            refresh_cache_version()
+            return False
+        col, field_names = open_collection(name)
+        aliases.warm_up(col)
+        previous = collection.name
+        activate_collection(col, field_names)
+    print(f"🔀 Aktif koleksiyon: {previous} -> {name}")
+    # yeni sürümün önbellek anahtarları boş: sık sorular arka planda yeniden hesaplanır
+    warmup.start(warm_question, f"geçiş: {name}", lock_path=warmup_lock_path())
+    return True
+
+def refresh_cache_version():
+    # aynı koleksiyona yerinde yeniden ingest (blue/green dışı): sürüm yeniden başlatmayı beklemeden değişsin
+    version = collection_version(collection)
+    if version != cache.version:
+        print(f"♻️ Koleksiyon içeriği değişti; önbellek sürümü: {cache.version} -> {version}")
+        cache.set_version(version)
+
+def watch_alias():
+    while True:
+        time.sleep(INDEX_WATCH_SECONDS)
+        try:
+            refresh_collection()
+        except Exception as e:
+            print("⚠️ Alias kontrolü başarısız:", e)
+
+@app.on_event("startup")
+def prewarm_openai():
+    # arka planda: başlangıcı bekletmez, ilk kullanıcı isteği TCP/TLS el sıkışması beklemez
+    threading.Thread(target=transport.prewarm, name="prewarm", daemon=True).start()
+
+@app.on_event("startup")
+def start_alias_watcher():
+    if MILVUS_FAKE or INDEX_WATCH_SECONDS <= 0:
+        return
+    threading.Thread(target=watch_alias, name="alias-watcher", daemon=True).start()
+
+@app.on_event("startup")
+def start_cache_warmup():
+    warmup.start(warm_question, "başlangıç", delay=warmup.WARMUP_DELAY_SECONDS, lock_path=warmup_lock_path())
+
+@app.on_event("shutdown")
+def flush_query_log():
+    # kuyrukta kalan sorgu günlüğü kayıtları diske yazılsın (QUERY_LOG_DIR)
+    querylog.stop()
 
 # -----------------------
 # SCHEMAS
@@ -102,6 +297,7 @@ collection, HAS_SOURCE, HAS_HEADER = init_milvus()
 class ChatRequest(BaseModel):
     message: str
     history: List[Dict[str, str]] = []  # [{"role":"user/assistant","content":"..."}]
+    scope: Optional[List[str]] = None  # kategori filtresi, ör. ["erasmus"] (categories.json)
 
 class SourceItem(BaseModel):
     name: str
@@ -111,43 +307,166 @@ class ChatResponse(BaseModel):
     answer: str
     sources: List[SourceItem] = []
 
+class ChatBatchRequest(BaseModel):
+    questions: List[str]  # geçmişsiz sorular
+    scope: Optional[List[str]] = None
+
+class ChatBatchItem(BaseModel):
+    question: str
+    answer: str
+    sources: List[SourceItem] = []
+    cached: bool = False
+    error: Optional[str] = None
+    timing_ms: Dict[str, float] = {}
+
+class ChatBatchResponse(BaseModel):
+    results: List[ChatBatchItem]
+    retrieval_ms: float
+    total_ms: float
+
 # -----------------------
 # RAG HELPERS
 # -----------------------
 GREETING_RE = re.compile(r"^\s*(merhaba|selam|günaydın|iyi\s*günler|iyi\s*akşamlar|hello|hi)\b", re.I)
 
-def embed_text(text: str) -> List[float]:
-    emb = client.embeddings.create(model=EMBED_MODEL, input=text)
-    return emb.data[0].embedding
+OFF_TOPIC_ANSWER = "Üzgünüm yalnızca Selçuk Üniversitesi ile ilgili sorulara cevap verebilirim."
+# modelin ret / "bilgi yok" cevapları: soruya özgüdür, parça id'lerine göre paylaşılmamalı
+REFUSAL_RE = re.compile(r"üzgünüm yalnızca|net bir bilgi bulamadım|bilgi (bulunmamaktadır|yer almamaktadır|yok)", re.I)
 
-def search_milvus(query_text: str, top_k: int = TOP_K) -> List[Dict[str, Any]]:
-    vec = embed_text(query_text)
+class RequestCancelled(Exception):
+    """İstemci bağlantıyı kapattı; kalan işler yapılmaz."""
 
-    output_fields = ["context"]
-    if HAS_SOURCE:
-        output_fields.append("source")
-    if HAS_HEADER:
-        output_fields.append("header")
+def check_cancel(cancel: Optional[threading.Event]):
+    if cancel is not None and cancel.is_set():
+        raise RequestCancelled()
 
-    results = collection.search(
-        data=[vec],
+def embed_text(text: str) -> List[float]:
+    # embedding koleksiyondan bağımsız -> sürümsüz önbellek
+    parts = [EMBED_MODEL, VECTOR_DIM, text]
+    vec = cache.get("emb", parts, versioned=False)
+    if vec is None:
+        vec = embedder.embed_one(text)
+        cache.set("emb", parts, vec, versioned=False)
+    return vec
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    # toplu sürüm: önbellekte olmayanlar tek liste çağrısıyla embed edilir (OpenAI: 2048 girdiye kadar
+    # tek istek; yerel modelde EMBED_BATCH_SIZE'lık parçalar)
+    vecs = [cache.get("emb", [EMBED_MODEL, VECTOR_DIM, t], versioned=False) for t in texts]
+    missing = [i for i, v in enumerate(vecs) if v is None]
+    if missing:
+        batch_size = embedder.max_request_inputs
+        for i, vec in zip(missing, embedder.embed([texts[i] for i in missing], batch_size=batch_size)):
+            vecs[i] = vec
+            cache.set("emb", [EMBED_MODEL, VECTOR_DIM, texts[i]], vec, versioned=False)
+    return vecs
+
+def to_query_vector(vec: List[float]):
+    if VECTOR_PRECISION == "float16":
+        import numpy as np
+        return np.asarray(vec, dtype=np.float16)
+    return vec
+
+SCOPE_RE = re.compile(r"^[a-z0-9-]{1,64}$")
+
+def scope_expr(scope: Optional[List[str]]) -> Optional[str]:
+    # kapsam -> partition key filtresi; Milvus sadece ilgili bölümleri tarar
+    if not scope or not HAS_CATEGORY:
+        return None
+    bad = [s for s in scope if not SCOPE_RE.match(s)]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Geçersiz scope: {bad}")
+    return "category in [" + ", ".join(f'"{s}"' for s in sorted(set(scope))) + "]"
+
+def make_hit(pk, score: float, fields: Dict[str, Any]) -> Dict[str, Any]:
+    sources = fields.get("sources")
+    return {
+        "id": pk,
+        "context": fields.get("context"),
+        "source": fields.get("source"),
+        "sources": json.loads(sources) if isinstance(sources, str) and sources else [],
+        "header": fields.get("header"),
+        "score": score,  # IP: büyük daha iyi
+    }
+
+def fetch_texts(pks: List[int], index) -> Dict[int, Dict[str, Any]]:
+    # önce yerel depo (mmap + LRU), depoda olmayanlar için Milvus query
+    col, store, text_fields = index
+    found = {pk: f for pk, f in store.get_many(pks).items() if f is not None}
+    missing = [pk for pk in pks if pk not in found]
+    if missing:
+        for row in col.query(expr=f"id in {missing}", output_fields=text_fields):
+            found[row["id"]] = row
+    return found
+
+def search_milvus(query_text: str, top_k: int = TOP_K, scope: Optional[List[str]] = None,
+                  cancel: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+    expr = scope_expr(scope)
+    parts = [normalize_question(query_text), top_k, expr]
+    hits = cache.get("search", parts)
+    if hits is None:
+        hits = _search_milvus(query_text, top_k, expr, cancel)
+        cache.set("search", parts, hits)
+    else:
+        recorder.note(cache="search")
+    recorder.note_hits(hits)
+    return hits
+
+def _search_milvus(query_text: str, top_k: int, expr: Optional[str],
+                   cancel: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
+    index = active_index
+    col, store, text_fields = index
+    with recorder.stage("embed"):
+        vec = to_query_vector(embed_text(query_text))
+    check_cancel(cancel)
+
+    with recorder.stage("search"):
+        results = col.search(
+            data=[vec],
+            anns_field=VECTOR_FIELD,
+            param={"metric_type": "IP", "params": SEARCH_PARAMS},
+            limit=top_k,
+            expr=expr,
+            # depo varsa sadece id + skor; yoksa metin alanları da gelir
+            output_fields=[] if store else text_fields,
+        )
+    return make_hits(results[0], index)
+
+def make_hits(result, index) -> List[Dict[str, Any]]:
+    _, store, text_fields = index
+    if store:
+        with recorder.stage("fetch"):
+            texts = fetch_texts([hit.id for hit in result], index)
+        return [make_hit(hit.id, float(hit.distance), texts.get(hit.id, {})) for hit in result]
+
+    return [
+        make_hit(hit.id, float(hit.distance), {f: hit.entity.get(f) for f in text_fields})
+        for hit in result
+    ]
+
+def search_many(query_texts: List[str], top_k: int = TOP_K, scope: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+    """search_milvus'un toplu hali: tek embedding çağrısı + tek çok-vektörlü arama."""
+    expr = scope_expr(scope)
+    found = [cache.get("search", [normalize_question(q), top_k, expr]) for q in query_texts]
+    missing = [i for i, hits in enumerate(found) if hits is None]
+    if not missing:
+        return found
+
+    index = active_index
+    col, store, text_fields = index
+    vecs = embed_texts([query_texts[i] for i in missing])
+    results = col.search(
+        data=[to_query_vector(v) for v in vecs],
         anns_field=VECTOR_FIELD,
-        param={"metric_type": "IP", "params": {"nprobe": 10}},
+        param={"metric_type": "IP", "params": SEARCH_PARAMS},
         limit=top_k,
-        output_fields=output_fields,
+        expr=expr,
+        output_fields=[] if store else text_fields,
     )
-
-    hits: List[Dict[str, Any]] = []
-    for hit in results[0]:
-        hits.append(
-            {
-                "context": hit.entity.get("context"),
-                "source": hit.entity.get("source") if HAS_SOURCE else None,
-                "header": hit.entity.get("header") if HAS_HEADER else None,
-                "score": float(hit.distance),  # IP: büyük daha iyi
-            }
-        )
-    return hits
+    for i, result in zip(missing, results):
+        found[i] = make_hits(result, index)
+        cache.set("search", [normalize_question(query_texts[i]), top_k, expr], found[i])
+    return found
 
 def build_context_text(contexts: List[Dict[str, Any]]) -> str:
     parts = []
@@ -160,16 +479,16 @@ def build_context_text(contexts: List[Dict[str, Any]]) -> str:
             parts.append(f"{i+1}) {ctx}")
     return "\n\n".join(parts)
 
-def ask_llm(question: str, contexts: List[Dict[str, Any]], history: List[Dict[str, str]]) -> str:
-    context_text = build_context_text(contexts)
-
-    prompt = f"""
-Aşağıdaki yönetmelik parçalarını kullanarak soruyu cevapla.
-
-YÖNETMELİK PARÇALARI:
-{context_text}
+# Sabit sistem mesajı + kurallar önde, ardından geçmiş, en sonda parçalar + soru. Aynı sohbetin
+# sonraki turlarında sistem mesajı + geçmiş birebir aynı önektir; OpenAI prompt önbelleği
+# >=1024 token'lık önekte devreye girer (tek başına ~150 token'lık sistem mesajı yetmez, uzun
+# sohbetlerde yeter). llm_cached_tokens / llm_cached_token_ratio bunu gösterir.
+# Metin değişirse PROMPT_VERSION artırılmalı (cevap önbellekleri buna bağlı).
+PROMPT_VERSION = "2"
 
-SORU: {question}
+SYSTEM_PROMPT = """
+Sen Selçuk Üniversitesi öğrenci işlerinde uzman bir asistansın.
+Kullanıcının mesajında verilen yönetmelik parçalarını kullanarak soruyu cevapla.
 
 KURALLAR:
 - Cevap Türkçe, kısa ve net olsun.
@@ -177,24 +496,92 @@ KURALLAR:
 - Okulla ilgisizse aynen şunu söyle: "Üzgünüm yalnızca Selçuk Üniversitesi ile ilgili sorulara cevap verebilirim."
 - Cevapta dosya adı / PDF adı / köşeli parantezli kaynak etiketi yazma.
 - Gereksiz uzun maddeler yazma; en fazla 5 madde.
-
-YANIT:
 """.strip()
 
-    messages = [{"role": "system", "content": "Sen Selçuk Üniversitesi öğrenci işlerinde uzman bir asistansın."}]
+def build_messages(question: str, contexts: List[Dict[str, Any]], history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
 
     for m in history[-6:]:
         if m.get("role") in ("user", "assistant") and m.get("content"):
             messages.append({"role": m["role"], "content": m["content"]})
 
-    messages.append({"role": "user", "content": prompt})
+    prompt = f"""
+YÖNETMELİK PARÇALARI:
+{build_context_text(contexts)}
+
+SORU: {question}
 
-    completion = client.chat.completions.create(
-        model=CHAT_MODEL,
+YANIT:
+""".strip()
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+def record_usage(usage):
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    metrics.incr("llm_prompt_tokens", usage.prompt_tokens or 0)
+    metrics.incr("llm_cached_tokens", cached)
+    metrics.incr("llm_completion_tokens", usage.completion_tokens or 0)
+
+def run_completion(messages: List[Dict[str, str]], model: str, cancel: Optional[threading.Event] = None,
+                   on_delta: Optional[Callable[[str], None]] = None, logprobs: bool = False):
+    """Akışlı chat çağrısı -> (metin, token logprob listesi)"""
+    t0 = time.perf_counter()
+    # stream: istemci giderse bağlantıyı kapatıp üretimi (ve token harcamasını) yarıda kesebilmek için
+    stream = client.chat.completions.create(
+        model=model,
         messages=messages,
         temperature=0.0,
+        stream=True,
+        stream_options={"include_usage": True},  # son parçada usage (cached_tokens dahil)
+        **({"logprobs": True} if logprobs else {}),
     )
-    answer = completion.choices[0].message.content.strip()
+    parts = []
+    token_logprobs: List[float] = []
+    try:
+        for chunk in stream:
+            check_cancel(cancel)
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                if on_delta is not None:
+                    on_delta(chunk.choices[0].delta.content)
+            if logprobs and chunk.choices and chunk.choices[0].logprobs and chunk.choices[0].logprobs.content:
+                token_logprobs.extend(t.logprob for t in chunk.choices[0].logprobs.content)
+            record_usage(getattr(chunk, "usage", None))
+    finally:
+        stream.close()
+    metrics.incr("llm_calls")
+    metrics.observe(f"llm:{model}", time.perf_counter() - t0)
+    recorder.add_stage("llm", time.perf_counter() - t0)
+    recorder.note(model=model)
+    return "".join(parts).strip(), token_logprobs
+
+def ask_llm(question: str, contexts: List[Dict[str, Any]], history: List[Dict[str, str]],
+            cancel: Optional[threading.Event] = None, on_delta: Optional[Callable[[str], None]] = None) -> str:
+    messages = build_messages(question, contexts, history)
+
+    # model kademesi (backend/cascade.py): basit soru -> küçük model, güveni düşükse büyük modele
+    tier, reasons = cascade.route(question, contexts, history)
+    answer = None
+    if tier == "small":
+        # küçük modelin cevabı kabul edilene kadar akıtılmaz (yükseltilirse yarım cevap görünmesin)
+        text, token_logprobs = run_completion(messages, cascade.CHAT_MODEL_SMALL, cancel, logprobs=True)
+        if cascade.confident(cascade.confidence(token_logprobs)):
+            metrics.incr("route_small")
+            answer = text
+            if on_delta is not None and text:
+                on_delta(text)
+        else:
+            metrics.incr("route_escalated")
+    elif cascade.enabled():
+        metrics.incr("route_large")
+        for reason in reasons:
+            metrics.incr(f"route_reason_{reason}")
+
+    if answer is None:
+        answer, _ = run_completion(messages, CHAT_MODEL, cancel, on_delta)
 
     answer = re.sub(r"\[[^\]]+\.pdf\]", "", answer, flags=re.I).strip()
     return answer
@@ -204,22 +591,24 @@ def extract_sources(contexts: List[Dict[str, Any]]) -> List[Dict[str, str]]:
     seen = set()
 
     for c in contexts:
-        raw = (c.get("source") or "").strip()
-        if not raw:
-            continue
+        # dedup edilmiş parçada aynı metnin geçtiği tüm dosyalar
+        for raw in (c.get("sources") or [c.get("source") or ""]):
+            raw = (raw or "").strip()
+            if not raw:
+                continue
 
-        name = os.path.basename(raw)
-        if name in seen:
-            continue
-        seen.add(name)
+            name = os.path.basename(raw)
+            if name in seen:
+                continue
+            seen.add(name)
 
-        file_path = (DOCS_DIR / name)
-        if file_path.exists() and DOCS_DIR.exists():
-            url = f"{DOCS_URL_PREFIX}/{name}"
-        else:
-            url = ""
+            file_path = (DOCS_DIR / name)
+            if file_path.exists() and DOCS_DIR.exists():
+                url = f"{DOCS_URL_PREFIX}/{name}"
+            else:
+                url = ""
 
-        sources.append({"name": name, "url": url})
+            sources.append({"name": name, "url": url})
 
     return sources
 
@@ -230,35 +619,383 @@ def extract_sources(contexts: List[Dict[str, Any]]) -> List[Dict[str, str]]:
 def health():
     return {"ok": True}
 
-@app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
-    q = (req.message or "").strip()
-    if not q:
-        return ChatResponse(answer="Bir soru yazar mısın?", sources=[])
-
-    # Selamlaşma: Milvus/OpenAI çağırmadan sabit cevap
-    if GREETING_RE.match(q):
-        return ChatResponse(
-            answer="Merhaba 👋 Selçuk Üniversitesi ile ilgili bir sorunuz varsa yardımcı olabilirim.",
-            sources=[],
-        )
-
-    contexts = search_milvus(q, top_k=TOP_K)
+def is_off_topic(q: str) -> bool:
+    """Yerel ön filtre: açıkça alakasızsa embedding + Milvus çağrılmaz. Kararsız skorlar geçer."""
+    profile = domain_profile
+    if profile is None:
+        return False
+    metrics.incr("prefilter_checked")
+    with recorder.stage("prefilter"):
+        rejected = profile.is_off_topic(q)
+    if rejected:
+        metrics.incr("prefilter_rejected")
+        recorder.note(outcome="rejected_prefilter")
+    return rejected
+
+def answer_question(q: str, history: List[Dict[str, str]], scope: Optional[List[str]] = None,
+                    cancel: Optional[threading.Event] = None,
+                    on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    if is_off_topic(q):
+        return {"answer": OFF_TOPIC_ANSWER, "sources": []}
+    contexts = search_milvus(q, top_k=TOP_K, scope=scope, cancel=cancel)
+    check_cancel(cancel)
+    return answer_from_contexts(q, contexts, history, cancel=cancel, on_delta=on_delta)
+
+def answer_from_contexts(q: str, contexts: List[Dict[str, Any]], history: List[Dict[str, str]],
+                         cancel: Optional[threading.Event] = None,
+                         on_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
     if not contexts:
-        return ChatResponse(
-            answer="Bu konuda yönetmeliklerde net bir bilgi bulamadım. Soruyu biraz daha detaylandırır mısın?",
-            sources=[],
-        )
+        recorder.note(outcome="no_context")
+        return {
+            "answer": "Bu konuda yönetmeliklerde net bir bilgi bulamadım. Soruyu biraz daha detaylandırır mısın?",
+            "sources": [],
+        }
 
     # ✅ Alakasız soru filtresi: skor düşükse kaynak da dönme, LLM'e de gitme
     best_score = float(contexts[0].get("score", 0.0))
+    recorder.note(best_score=round(best_score, 4))
     if best_score < MIN_SCORE:
-        return ChatResponse(
-            answer="Üzgünüm yalnızca Selçuk Üniversitesi ile ilgili sorulara cevap verebilirim.",
-            sources=[],
-        )
-
-    answer = ask_llm(q, contexts, req.history)
+        recorder.note(outcome="rejected_score")
+        return {"answer": OFF_TOPIC_ANSWER, "sources": []}
+
+    # Aynı soru farklı kelimelerle sorulunca çoğu zaman aynı parçalar gelir: geçmişsiz isteklerde
+    # cevap, getirilen parça id'lerine göre de saklanır (sürümlü -> yeniden ingest'te geçersizleşir).
+    # Ret cevapları saklanmaz: aynı parçaları getiren başka bir soruya da ret dönerdi.
+    memo = [cascade.model_key(CHAT_MODEL), PROMPT_VERSION, sorted(c["id"] for c in contexts)]
+    answer = None if history else cache.get("answer_by_ids", memo)
+    if answer is not None and REFUSAL_RE.search(answer):
+        answer = None  # eski sürümün sakladığı ret cevabı
+    if answer is None:
+        answer = ask_llm(q, contexts, history, cancel=cancel, on_delta=on_delta)
+        if not history and not REFUSAL_RE.search(answer):
+            cache.set("answer_by_ids", memo, answer)
+    else:
+        metrics.incr("answer_memo_hits")
+        recorder.note(cache="answer_memo")
+    recorder.note(outcome="answered")
     sources = extract_sources(contexts)
 
-    return ChatResponse(answer=answer, sources=sources)
+    return {"answer": answer, "sources": sources}
+
+def quick_answer(q: str) -> Optional[Dict[str, Any]]:
+    if not q:
+        return {"answer": "Bir soru yazar mısın?", "sources": []}
+
+    # Selamlaşma: Milvus/OpenAI çağırmadan sabit cevap
+    if GREETING_RE.match(q):
+        return {
+            "answer": "Merhaba 👋 Selçuk Üniversitesi ile ilgili bir sorunuz varsa yardımcı olabilirim.",
+            "sources": [],
+        }
+    return None
+
+def answer_cache_key(q: str, scope: Optional[List[str]]) -> List[Any]:
+    return [cascade.model_key(CHAT_MODEL), PROMPT_VERSION, normalize_question(q), sorted(scope or [])]
+
+def prior_history(q: str, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    # eski widget sürümleri soruyu history'ye ekleyip öyle gönderir: sondaki aynı kullanıcı mesajı
+    # geçmiş sayılmaz (yoksa istek hiç önbelleğe düşmez, soru prompt'ta iki kez geçer)
+    if history and history[-1].get("role") == "user" and (history[-1].get("content") or "").strip() == q:
+        return history[:-1]
+    return history
+
+def handle_chat(req: ChatRequest, cancel: Optional[threading.Event] = None,
+                on_delta: Optional[Callable[[str], None]] = None,
+                request_id: Optional[str] = None) -> Dict[str, Any]:
+    q = (req.message or "").strip()
+    history = prior_history(q, req.history)
+    # RECORD_PATH ayarlıysa örneklenen istekler kaydedilir (backend/recorder.py, loadtest/replay.py)
+    with recorder.record(q, len(history), req.scope, request_id):
+        quick = quick_answer(q)
+        if quick is not None:
+            recorder.note(outcome="quick")
+            return quick
+
+        # geçmişsiz sorularda cevap önbelleği (geçmiş cevabı değiştirebilir)
+        parts = answer_cache_key(q, req.scope)
+        result = None if history else cache.get("answer", parts)
+        if result is None:
+            result = answer_question(q, history, req.scope, cancel=cancel, on_delta=on_delta)
+            if not history:
+                cache.set("answer", parts, result)
+        else:
+            recorder.note(cache="answer", outcome="rejected_cached" if result["answer"] == OFF_TOPIC_ANSWER else "answered")
+        return result
+
+def iter_chat(req: ChatRequest, cancel: Optional[threading.Event] = None,
+              request_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    handle_chat'in akışlı hali: LLM token'ları geldikçe {"delta": "..."}, en sonda
+    {"done": True, "answer": ..., "sources": [...]} verir (önbellekten gelen cevapta sadece sonuncusu).
+    Upstream zaman aşımında son olay {"error": "timeout"} olur (/chat'teki 504'ün karşılığı).
+    Akış yarıda bırakılırsa (generator kapanır) istek iptal edilir.
+    """
+    cancel = cancel or threading.Event()
+    events: "queue.Queue[tuple]" = queue.Queue()
+
+    def work():
+        try:
+            events.put(("done", handle_chat(req, cancel, lambda d: events.put(("delta", d)), request_id)))
+        except BaseException as e:
+            events.put(("error", e))
+
+    threading.Thread(target=work, name="chat-stream", daemon=True).start()
+    try:
+        while True:
+            kind, value = events.get()
+            if kind == "delta":
+                yield {"delta": value}
+            elif kind == "done":
+                yield dict(value, done=True)
+                return
+            elif isinstance(value, APITimeoutError):
+                metrics.incr("upstream_timeouts")
+                yield {"error": "timeout"}
+                return
+            else:
+                raise value
+    finally:
+        cancel.set()
+
+def warm_question(q: str, answers: bool = False) -> bool:
+    """
+    Önbellek ısıtma (backend/warmup.py): soruyu handle_chat'in kullandığı önbelleklere hesaplar.
+    İstek sayılmaz (trafik kaydı / sorgu günlüğüne yazılmaz). Zaten önbellekteyse False.
+    """
+    if quick_answer(q) is not None:
+        return False
+    if not answers:
+        if cache.get("search", [normalize_question(q), TOP_K, None]) is not None:
+            return False
+        search_milvus(q, top_k=TOP_K)
+        return True
+
+    parts = answer_cache_key(q, None)
+    if cache.get("answer", parts) is not None:
+        return False
+    cache.set("answer", parts, answer_question(q, []))
+    return True
+
+def warmup_lock_path() -> Optional[str]:
+    # paylaşımlı SQLite önbelleğinde aynı makinedeki worker'lardan biri ısıtması yeter
+    return cache.path + ".warmup.lock" if isinstance(cache, SQLiteCache) else None
+
+def answer_batch(questions: List[str], scope: Optional[List[str]] = None,
+                 concurrency: int = BATCH_CONCURRENCY) -> Dict[str, Any]:
+    """
+    Çok sayıda geçmişsiz soruyu birlikte cevaplar (regresyon kontrolü, SSS ön-üretimi).
+    Önbellekte olmayanlar tek embedding çağrısı + tek çok-vektörlü aramayla getirilir, LLM
+    çağrıları `concurrency` kadar paralel yapılır. Sonuçlar soru sırasıyla döner.
+    """
+    t0 = time.perf_counter()
+    questions = [(q or "").strip() for q in questions]
+    results: List[Dict[str, Any]] = [
+        {"question": q, "answer": "", "sources": [], "cached": False, "error": None,
+         "timing_ms": {"retrieval": 0.0, "answer": 0.0}}
+        for q in questions
+    ]
+
+    pending = []
+    duplicates: Dict[int, int] = {}  # aynı sorunun tekrarı -> ilk görüldüğü sıra
+    first_seen: Dict[str, int] = {}
+    for i, q in enumerate(questions):
+        found = quick_answer(q) or cache.get("answer", answer_cache_key(q, scope))
+        if found is not None:
+            results[i].update(found, cached=True)
+            continue
+        if is_off_topic(q):
+            results[i].update(answer=OFF_TOPIC_ANSWER, sources=[])
+            continue
+        norm = normalize_question(q)
+        if norm in first_seen:
+            duplicates[i] = first_seen[norm]
+            continue
+        first_seen[norm] = i
+        pending.append(i)
+
+    t_retrieval = time.perf_counter()
+    try:
+        contexts = search_many([questions[i] for i in pending], top_k=TOP_K, scope=scope) if pending else []
+    except APITimeoutError:
+        # embedding upstream'i takıldı: önbellekten gelenler yine döner, kalanlar hatalı işaretlenir
+        metrics.incr("upstream_timeouts")
+        for i in pending:
+            results[i]["error"] = "timeout"
+        pending, contexts = [], []
+    retrieval_ms = round((time.perf_counter() - t_retrieval) * 1000, 1)
+
+    def run(i: int, ctx: List[Dict[str, Any]]):
+        t = time.perf_counter()
+        try:
+            result = answer_from_contexts(questions[i], ctx, [])
+            cache.set("answer", answer_cache_key(questions[i], scope), result)
+            results[i].update(result)
+        except Exception as e:
+            results[i]["error"] = f"{type(e).__name__}: {e}"
+        results[i]["timing_ms"] = {"retrieval": retrieval_ms, "answer": round((time.perf_counter() - t) * 1000, 1)}
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as pool:
+            list(pool.map(run, pending, contexts))
+    for i, j in duplicates.items():
+        results[i].update({k: v for k, v in results[j].items() if k not in ("question", "timing_ms")}, cached=True)
+
+    metrics.incr("batch_requests")
+    metrics.incr("batch_questions", len(questions))
+    return {
+        "results": results,
+        "retrieval_ms": retrieval_ms,
+        "total_ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+
+async def wait_disconnect(request: Request):
+    # gövde okunduktan sonra gelecek tek mesaj: istemci bağlantıyı kapatınca http.disconnect
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest, request: Request):
+    cancel = threading.Event()
+    work = asyncio.ensure_future(
+        run_in_threadpool(handle_chat, req, cancel, None, request.headers.get("x-request-id"))
+    )
+    disconnect = asyncio.ensure_future(wait_disconnect(request))
+
+    done, _ = await asyncio.wait({work, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    profiler.request_done()
+    if work in done:
+        disconnect.cancel()
+        try:
+            return ChatResponse(**work.result())
+        except APITimeoutError:
+            # takılan upstream: CHAT_READ_TIMEOUT / EMBED_READ_TIMEOUT (backend/transport.py)
+            metrics.incr("upstream_timeouts")
+            raise HTTPException(status_code=504, detail="Yanıt servisi zaman aşımına uğradı, tekrar dener misin?")
+
+    # ✅ İstemci gitti (widget kapandı / yeni soru / AbortController): kalan embedding,
+    # arama ve LLM üretimi iptal edilir; thread bir sonraki kontrol noktasında çıkar
+    cancel.set()
+    print("🛑 İstemci bağlantıyı kapattı, istek iptal edildi")
+    work.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return Response(status_code=499)
+
+@app.post("/chat/batch", response_model=ChatBatchResponse)
+def chat_batch(req: ChatBatchRequest):
+    if len(req.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"En fazla {BATCH_MAX_QUESTIONS} soru gönderilebilir.")
+    try:
+        return answer_batch(req.questions, scope=req.scope)
+    finally:
+        profiler.request_done()
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """NDJSON akışı: her satır iter_chat olayı. İstemci koparsa üretim durdurulur."""
+    cancel = threading.Event()
+    events = iter_chat(req, cancel, request.headers.get("x-request-id"))
+
+    async def body():
+        try:
+            async for event in iterate_in_threadpool(events):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except RequestCancelled:
+            pass
+        finally:
+            cancel.set()
+            profiler.request_done()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+# -----------------------
+# ADMIN
+# -----------------------
+class SwitchRequest(BaseModel):
+    collection: Optional[str] = None  # boşsa en yeni sürüm
+
+def require_admin(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Yönetim uçları kapalı (ADMIN_TOKEN ayarlı değil).")
+    if not hmac.compare_digest(token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Geçersiz X-Admin-Token.")
+
+def require_milvus():
+    if MILVUS_FAKE:
+        raise HTTPException(status_code=409, detail="MILVUS_FAKE=true iken alias işlemleri yok.")
+
+def index_status() -> Dict[str, Any]:
+    return {
+        "alias": COLLECTION_NAME,
+        "active": collection.name,
+        "target": aliases.resolve(COLLECTION_NAME),
+        "versions": aliases.list_versions(COLLECTION_NAME),
+    }
+
+@app.get("/admin/index")
+def admin_index(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    require_milvus()
+    return index_status()
+
+@app.post("/admin/index/switch")
+def admin_index_switch(req: SwitchRequest, x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    require_milvus()
+    versions = aliases.list_versions(COLLECTION_NAME)
+    target = req.collection or (versions[-1] if versions else None)
+    if target not in versions:
+        raise HTTPException(status_code=400, detail=f"Bilinmeyen sürüm: {target}. Sürümler: {versions}")
+    try:
+        aliases.switch_alias(COLLECTION_NAME, target)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    refresh_collection()
+    return index_status()
+
+@app.post("/admin/index/rollback")
+def admin_index_rollback(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    require_milvus()
+    try:
+        aliases.rollback(COLLECTION_NAME)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    refresh_collection()
+    return index_status()
+
+@app.post("/admin/profile", response_class=PlainTextResponse)
+async def admin_profile(seconds: float = 10.0, requests: int = 0, interval_ms: float = 5.0, idle: bool = False,
+                        x_admin_token: Optional[str] = Header(None)):
+    """
+    Bu worker'ın örneklemeli profilini alır: `seconds` saniye ya da `requests` kadar /chat isteği
+    (hangisi önce dolarsa). Çıktı collapsed stack: flamegraph.pl / speedscope ile açılır.
+    Birden çok worker varsa istek hangi worker'a düştüyse onun profili alınır.
+    """
+    require_admin(x_admin_token)
+    try:
+        session = profiler.start(seconds, requests=requests, interval_ms=interval_ms, idle=idle)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        while not session.finished():
+            await asyncio.sleep(0.05)
+    finally:
+        profiler.finish(session)
+    return PlainTextResponse(
+        session.collapsed(),
+        headers={"X-Profile-Samples": str(session.samples), "X-Profile-Requests": str(session.requests)},
+    )
+
+@app.get("/metrics")
+def get_metrics():
+    snap = metrics.snapshot()
+    snap["openai_pool"] = transport.pool_stats()
+    prompt_tokens = snap["counters"].get("llm_prompt_tokens", 0)
+    if prompt_tokens:
+        snap["llm_cached_token_ratio"] = round(snap["counters"].get("llm_cached_tokens", 0) / prompt_tokens, 4)
+    return snap
+
+@app.get("/cache/stats")
+def cache_stats():
+    return dict(cache.stats(), version=cache.version)
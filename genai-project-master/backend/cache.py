@@ -0,0 +1,208 @@
+# backend/cache.py
+"""
+Sorgu embedding'leri, retrieval sonuçları ve cevaplar için önbellek.
+
+CACHE_BACKEND:
+- "sqlite" (varsayılan): WAL modunda tek bir SQLite dosyası; aynı makinedeki tüm uvicorn
+  worker'ları paylaşır, worker eklemek isabet oranını düşürmez. Dosya CACHE_PATH'te (varsayılan:
+  sistemin geçici dizini, çalışma dizinine yazılmaz); açılamazsa "memory"ye düşülür.
+- "memory": süreç içi LRU (tek worker / testler).
+- "none": kapalı.
+
+Her kayıt TTL'li, toplam kayıt sayısı CACHE_MAX_ENTRIES ile sınırlı (en eski erişilen silinir).
+SQLite'ta erişim zamanı her isabette değil, en fazla CACHE_TOUCH_SECONDS'te bir güncellenir
+(okuma yolu yazma kilidini almaz).
+Sürümlü kayıtlar (retrieval/cevap/parça id'lerine göre cevap) koleksiyonun ingest sürümünü anahtara katar; yeniden ingest
+sonrası sürüm değişince eski kayıtlar artık eşleşmez ve temizlenir. Embedding'ler koleksiyondan
+bağımsızdır (sadece model + boyut), sürümsüz tutulur.
+
+Önbellek hataları isteği asla düşürmez: okuma hatası -> miss, yazma hatası -> yok sayılır.
+"""
+import os
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite").lower()
+CACHE_PATH = os.getenv("CACHE_PATH", "").strip() or os.path.join(tempfile.gettempdir(), "genai_cache.sqlite3")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "50000"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "86400"))
+# her N yazmada bir süresi dolmuş / fazlalık kayıtlar silinir
+CACHE_EVICT_EVERY = int(os.getenv("CACHE_EVICT_EVERY", "200"))
+# LRU için erişim zamanı çözünürlüğü (sn)
+CACHE_TOUCH_SECONDS = float(os.getenv("CACHE_TOUCH_SECONDS", "60"))
+
+
+def normalize_question(text: str) -> str:
+    return " ".join((text or "").replace("İ", "i").replace("I", "ı").lower().split())
+
+
+def make_key(namespace: str, version: str, parts: Sequence[Any]) -> str:
+    raw = json.dumps([namespace, version, list(parts)], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Cache:
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = ""
+        self.hits = 0
+        self.misses = 0
+
+    def set_version(self, version: str):
+        self.version = version
+
+    def get(self, namespace: str, parts: Sequence[Any], versioned: bool = True) -> Optional[Any]:
+        key = make_key(namespace, self.version if versioned else "", parts)
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, namespace: str, parts: Sequence[Any], value: Any, versioned: bool = True):
+        version = self.version if versioned else ""
+        self._set(make_key(namespace, version, parts), version, value)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": self.__class__.__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def _get(self, key: str) -> Optional[Any]:
+        return None
+
+    def _set(self, key: str, version: str, value: Any):
+        pass
+
+
+class NullCache(Cache):
+    pass
+
+
+class MemoryCache(Cache):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_version(self, version: str):
+        with self._lock:
+            for key in [k for k, (v, _, _) in self._data.items() if v not in ("", version)]:
+                del self._data[key]
+        super().set_version(version)
+
+    def _get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            _, expires_at, value = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key, version, value):
+        with self._lock:
+            self._data[key] = (version, time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class SQLiteCache(Cache):
+    def __init__(self, path: str = CACHE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, version TEXT NOT NULL, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=2.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=2000")
+            self._local.conn = conn
+        return conn
+
+    def set_version(self, version: str):
+        try:
+            self._conn().execute("DELETE FROM cache WHERE version NOT IN ('', ?)", (version,))
+        except sqlite3.Error as e:
+            print("⚠️ Cache temizlenemedi:", e)
+        super().set_version(version)
+
+    def _get(self, key):
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, expires_at, accessed_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                return None
+            # kaba LRU: sıcak kayıtlar her isabette yazma kilidi almasın
+            if now - row[2] >= CACHE_TOUCH_SECONDS:
+                conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(row[0])
+        except sqlite3.Error:
+            return None
+
+    def _set(self, key, version, value):
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, version, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, version, json.dumps(value, ensure_ascii=False), now + self.ttl, now),
+            )
+            self._writes += 1
+            # worker'lar aynı anda temizlik yapmasın diye rastgele kaydırılmış periyot
+            if self._writes % CACHE_EVICT_EVERY == random.randrange(CACHE_EVICT_EVERY):
+                self.evict(now)
+        except sqlite3.Error:
+            pass
+
+    def evict(self, now: Optional[float] = None):
+        conn = self._conn()
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now or time.time(),))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            " SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+def get_cache() -> Cache:
+    if CACHE_BACKEND == "sqlite":
+        try:
+            return SQLiteCache()
+        except sqlite3.Error as e:
+            print(f"⚠️ SQLite önbelleği açılamadı ({CACHE_PATH}): {e}; süreç içi önbellek kullanılıyor.")
+            return MemoryCache()
+    if CACHE_BACKEND == "memory":
+        return MemoryCache()
+    if CACHE_BACKEND == "none":
+        return NullCache()
+    raise RuntimeError(f"CACHE_BACKEND='{CACHE_BACKEND}' desteklenmiyor (sqlite | memory | none).")
@@ -0,0 +1,84 @@
+# backend/cascade.py
+"""
+Model kademesi: basit sorular ucuz/hızlı modele (CHAT_MODEL_SMALL), diğerleri CHAT_MODEL'e.
+
+Yönlendirme sinyalleri (hepsi "basit" derse küçük model):
+- soru uzunluğu (kelime)          <= ROUTE_MAX_WORDS
+- en iyi parçanın skoru            >= ROUTE_MIN_TOP_SCORE
+- 1. ile 2. parça skor farkı       >= ROUTE_MIN_MARGIN   (tek bir parça açıkça öne çıkıyor)
+- farklı kaynak dosya sayısı       <= ROUTE_MAX_SOURCES
+- sohbet geçmişi (mesaj)           <= ROUTE_MAX_HISTORY
+
+Küçük modelin cevabı token logprob ortalamasından hesaplanan güven ESCALATE_MIN_CONFIDENCE'ın
+altındaysa soru büyük modele yükseltilir. Rota ve büyük modele gitme sebepleri /metrics'e
+yazılır (route_*, route_reason_*); eşikler bu sayaçlara bakılarak ayarlanır.
+
+CHAT_MODEL_SMALL boşsa kademe kapalıdır, her şey CHAT_MODEL'e gider.
+"""
+import os
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+CHAT_MODEL_SMALL = os.getenv("CHAT_MODEL_SMALL", "").strip()
+
+ROUTE_MAX_WORDS = int(os.getenv("ROUTE_MAX_WORDS", "16"))
+ROUTE_MIN_TOP_SCORE = float(os.getenv("ROUTE_MIN_TOP_SCORE", "0.45"))
+ROUTE_MIN_MARGIN = float(os.getenv("ROUTE_MIN_MARGIN", "0.03"))
+ROUTE_MAX_SOURCES = int(os.getenv("ROUTE_MAX_SOURCES", "2"))
+ROUTE_MAX_HISTORY = int(os.getenv("ROUTE_MAX_HISTORY", "2"))
+ESCALATE_MIN_CONFIDENCE = float(os.getenv("ESCALATE_MIN_CONFIDENCE", "0.80"))
+
+
+def enabled() -> bool:
+    return bool(CHAT_MODEL_SMALL)
+
+
+def model_key(chat_model: str) -> str:
+    # cevap önbellek anahtarları için: kademe açıkken cevap iki modelden birinden gelebilir
+    return f"{chat_model}+{CHAT_MODEL_SMALL}" if enabled() else chat_model
+
+
+def signals(question: str, contexts: List[Dict[str, Any]], history: List[Dict[str, str]]) -> Dict[str, Any]:
+    scores = [float(c.get("score", 0.0)) for c in contexts]
+    sources = set()
+    for c in contexts:
+        sources.update(c.get("sources") or [c.get("source") or ""])
+    sources.discard("")
+    return {
+        "words": len(question.split()),
+        "top_score": scores[0] if scores else 0.0,
+        "margin": scores[0] - scores[1] if len(scores) > 1 else 1.0,
+        "sources": len(sources),
+        "history": len(history),
+    }
+
+
+def route(question: str, contexts: List[Dict[str, Any]], history: List[Dict[str, str]]) -> Tuple[str, List[str]]:
+    """-> ("small" | "large", büyük modele gitme sebepleri)"""
+    if not enabled():
+        return "large", []
+    s = signals(question, contexts, history)
+    reasons = []
+    if s["words"] > ROUTE_MAX_WORDS:
+        reasons.append("long_question")
+    if s["top_score"] < ROUTE_MIN_TOP_SCORE:
+        reasons.append("low_score")
+    if s["margin"] < ROUTE_MIN_MARGIN:
+        reasons.append("small_margin")
+    if s["sources"] > ROUTE_MAX_SOURCES:
+        reasons.append("many_sources")
+    if s["history"] > ROUTE_MAX_HISTORY:
+        reasons.append("history")
+    return ("large" if reasons else "small"), reasons
+
+
+def confidence(logprobs: List[float]) -> Optional[float]:
+    """Token logprob ortalamasının üsteli (0-1, geometrik ortalama olasılık). Logprob yoksa None."""
+    if not logprobs:
+        return None
+    return math.exp(sum(logprobs) / len(logprobs))
+
+
+def confident(conf: Optional[float]) -> bool:
+    # logprob gelmediyse (sağlayıcı desteklemiyor) küçük modelin cevabı kabul edilir
+    return conf is None or conf >= ESCALATE_MIN_CONFIDENCE
@@ -0,0 +1,154 @@
+# backend/chunk_store.py
+"""
+Salt-okunur yerel parça deposu (iki aşamalı retrieval için).
+
+ANN araması Milvus'tan sadece id + skor döndürür; metinler (context, source, header ...) bu
+depodan okunur. Böylece her aramada 65 KB'a kadar varchar alanları gRPC ile taşınmaz.
+
+Dosyalar (CHUNK_STORE_PATH=chunks ise):
+- chunks.bin       : ardışık UTF-8 JSON kayıtları (mmap ile okunur)
+- chunks.idx       : id'ye göre sıralı (id, offset, length) dizileri
+- chunks.meta.json : koleksiyon adı ve id'si, kayıt sayısı, oluşturulma zamanı
+
+Blue/green ingest'te (bkz. backend/aliases.py) her sürümün kendi deposu olur: chunks.<koleksiyon>.*
+
+Oluşturma: ingest.py sonunda (CHUNK_STORE_PATH ayarlıysa) veya
+    python -m backend.chunk_store export <koleksiyon> <hedef_yol>
+"""
+import os
+import json
+import mmap
+import time
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+CHUNK_STORE_CACHE_SIZE = int(os.getenv("CHUNK_STORE_CACHE_SIZE", "4096"))
+STORE_FIELDS = ["context", "source", "sources", "header", "category"]
+
+
+def _paths(path: str) -> Tuple[str, str, str]:
+    return path + ".bin", path + ".idx", path + ".meta.json"
+
+
+def version_path(path: str, collection_name: str) -> str:
+    return f"{path}.{collection_name}"
+
+
+def remove_chunk_store(path: str):
+    for p in _paths(path):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def write_chunk_store(path: str, rows: Iterable[Tuple[int, Dict[str, Any]]], meta: Optional[Dict[str, Any]] = None) -> int:
+    """(id, alanlar) çiftlerini yazar; dosyalar önce .tmp olarak yazılıp atomik olarak değiştirilir."""
+    bin_path, idx_path, meta_path = _paths(path)
+    entries = []
+    offset = 0
+    with open(bin_path + ".tmp", "wb") as f:
+        for pk, fields in rows:
+            data = json.dumps(fields, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            f.write(data)
+            entries.append((int(pk), offset, len(data)))
+            offset += len(data)
+
+    entries.sort()
+    ids = array("q", (e[0] for e in entries))
+    offsets = array("q", (e[1] for e in entries))
+    lengths = array("q", (e[2] for e in entries))
+    with open(idx_path + ".tmp", "wb") as f:
+        array("q", [len(entries)]).tofile(f)
+        ids.tofile(f)
+        offsets.tofile(f)
+        lengths.tofile(f)
+
+    meta = dict(meta or {}, count=len(entries), created_at=int(time.time()))
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    os.replace(bin_path + ".tmp", bin_path)
+    os.replace(idx_path + ".tmp", idx_path)
+    os.replace(meta_path + ".tmp", meta_path)
+    return len(entries)
+
+
+def iter_collection_rows(collection, batch_size: int = 1000):
+    """Milvus koleksiyonundaki tüm parçaları (id, alanlar) olarak gezer."""
+    field_names = {f.name for f in collection.schema.fields}
+    fields = [f for f in STORE_FIELDS if f in field_names]
+    it = collection.query_iterator(batch_size=batch_size, output_fields=["id"] + fields)
+    try:
+        while True:
+            batch = it.next()
+            if not batch:
+                break
+            for row in batch:
+                yield row["id"], {f: row.get(f) for f in fields}
+    finally:
+        it.close()
+
+
+def export_collection(collection, path: str) -> int:
+    try:
+        collection_id = collection.describe().get("collection_id")
+    except Exception:
+        collection_id = None
+    meta = {"collection": collection.name, "collection_id": collection_id}
+    count = write_chunk_store(path, iter_collection_rows(collection), meta=meta)
+    print(f"🗂️ Parça deposu yazıldı: {path} ({count} kayıt)")
+    return count
+
+
+class ChunkStore:
+    def __init__(self, path: str, cache_size: int = CHUNK_STORE_CACHE_SIZE):
+        bin_path, idx_path, meta_path = _paths(path)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        with open(idx_path, "rb") as f:
+            count = array("q")
+            count.fromfile(f, 1)
+            n = count[0]
+            self._ids, self._offsets, self._lengths = array("q"), array("q"), array("q")
+            self._ids.fromfile(f, n)
+            self._offsets.fromfile(f, n)
+            self._lengths.fromfile(f, n)
+
+        self._file = open(bin_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.get = lru_cache(maxsize=cache_size)(self._get)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _get(self, pk: int) -> Optional[Dict[str, Any]]:
+        i = bisect_left(self._ids, pk)
+        if i == len(self._ids) or self._ids[i] != pk or self._mm is None:
+            return None
+        start = self._offsets[i]
+        return json.loads(self._mm[start:start + self._lengths[i]])
+
+    def get_many(self, pks: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        return {pk: self.get(pk) for pk in pks}
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+
+if __name__ == "__main__":
+    import sys
+    from pymilvus import connections, Collection
+
+    if len(sys.argv) != 4 or sys.argv[1] != "export":
+        raise SystemExit("Kullanım: python -m backend.chunk_store export <koleksiyon> <hedef_yol>")
+
+    connections.connect(alias="default", host=os.getenv("MILVUS_HOST", "localhost"),
+                        port=os.getenv("MILVUS_PORT", "19530"))
+    col = Collection(sys.argv[2])
+    col.load()
+    export_collection(col, sys.argv[3])
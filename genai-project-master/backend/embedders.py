@@ -0,0 +1,131 @@
+# backend/embedders.py
+"""
+Takılabilir embedding arayüzü (ingest.py ve backend/app.py ortak kullanır).
+
+EMBED_MODEL ile seçilir:
+- "text-embedding-3-small" vb.  -> OpenAI embeddings API
+- "local:/models/e5-small"      -> diskteki sentence-transformers modeli (CPU, torch veya ONNX)
+- "hash" / "hash:test"          -> deterministik hashing embedder (çevrimdışı test)
+
+Hepsi liste girdisi alır, BATCH boyutunda parçalar ve parçaları bir thread pool'da paralel işler.
+"""
+import os
+import math
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "4"))
+# yerel model için: torch | onnx
+LOCAL_EMBED_BACKEND = os.getenv("LOCAL_EMBED_BACKEND", "torch")
+
+
+class Embedder:
+    name = "base"
+    # tek istekte gönderilebilecek en fazla girdi (None: sınır yok / yerel model -> batch_size)
+    max_request_inputs: Optional[int] = None
+
+    def __init__(self, dim: int, batch_size: int = EMBED_BATCH_SIZE, threads: int = EMBED_THREADS):
+        self.dim = dim
+        self.batch_size = max(1, batch_size)
+        self.threads = max(1, threads)
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def embed(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        if not texts:
+            return []
+        size = max(1, batch_size or self.batch_size)
+        batches = [texts[i:i + size] for i in range(0, len(texts), size)]
+        if len(batches) == 1 or self.threads == 1:
+            results = [self._embed_batch(b) for b in batches]
+        else:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="embed")
+            results = list(self._pool.map(self._embed_batch, batches))
+        return [vec for batch in results for vec in batch]
+
+    def embed_one(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0]
+
+
+class OpenAIEmbedder(Embedder):
+    name = "openai"
+    max_request_inputs = 2048  # embeddings API girdi listesi sınırı
+
+    def __init__(self, model: str, dim: int, client=None, **kwargs):
+        super().__init__(dim, **kwargs)
+        if client is None:
+            from backend.transport import openai_client
+            client = openai_client("embed")
+        self.client = client
+        self.model = model
+        # text-embedding-3-* modelleri kısaltılmış boyut (dimensions) destekler
+        self.kwargs = {"dimensions": dim} if model.startswith("text-embedding-3") else {}
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        resp = self.client.embeddings.create(model=self.model, input=texts, **self.kwargs)
+        return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
+
+class LocalEmbedder(Embedder):
+    """Diskten yüklenen küçük bir sentence-transformers modeli (CPU)."""
+    name = "local"
+
+    def __init__(self, model_path: str, dim: int, backend: str = LOCAL_EMBED_BACKEND, **kwargs):
+        super().__init__(dim, **kwargs)
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError("Yerel embedding için: pip install sentence-transformers (ONNX için [onnx])") from e
+
+        model_kwargs = {"device": "cpu"}
+        if backend != "torch":
+            model_kwargs["backend"] = backend
+        self.model = SentenceTransformer(model_path, **model_kwargs)
+
+        native_dim = self.model.get_sentence_embedding_dimension()
+        if dim > native_dim:
+            raise RuntimeError(f"VECTOR_DIM={dim}, modelin boyutundan ({native_dim}) büyük olamaz.")
+        self.native_dim = native_dim
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        vecs = self.model.encode(texts, batch_size=len(texts), normalize_embeddings=True, convert_to_numpy=True)
+        if self.dim < self.native_dim:
+            vecs = vecs[:, :self.dim]
+            vecs = vecs / ((vecs ** 2).sum(axis=1, keepdims=True) ** 0.5).clip(min=1e-12)
+        return vecs.tolist()
+
+
+class HashingEmbedder(Embedder):
+    """Karakter n-gram feature hashing; ağ/model gerektirmez, aynı metin -> aynı vektör."""
+    name = "hash"
+
+    def __init__(self, dim: int, ngram_range=(3, 5), **kwargs):
+        super().__init__(dim, **kwargs)
+        self.ngram_range = ngram_range
+
+    def _vector(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        t = f" {(text or '').lower()} "
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            for i in range(len(t) - n + 1):
+                h = int.from_bytes(hashlib.blake2b(t[i:i + n].encode("utf-8"), digest_size=8).digest(), "little")
+                vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+        return [x / norm for x in vec]
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(t) for t in texts]
+
+
+def get_embedder(model: str, dim: int, client=None, **kwargs) -> Embedder:
+    if model == "hash" or model.startswith("hash:"):
+        return HashingEmbedder(dim, **kwargs)
+    if model.startswith("local:"):
+        return LocalEmbedder(model[len("local:"):], dim, **kwargs)
+    return OpenAIEmbedder(model, dim, client=client, **kwargs)
@@ -0,0 +1,91 @@
+# backend/fakes.py
+"""
+Yük testleri için sahte Milvus koleksiyonu (MILVUS_FAKE=true).
+
+Gerçek pymilvus Collection.search gibi bloklayan bir çağrıdır: log-normal dağılımlı
+bir gecikme kadar uyur ve format.json'daki parçalardan sonuç döner.
+"""
+import os
+import re
+import json
+import math
+import random
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def parse_latency(spec: str):
+    # "median_ms,sigma" -> log-normal parametreleri
+    median, sigma = (float(x) for x in spec.split(","))
+    return median, sigma
+
+
+def sample_latency_ms(median_ms: float, sigma: float, rng: random.Random) -> float:
+    return median_ms * math.exp(rng.gauss(0.0, sigma))
+
+
+class FakeEntity:
+    def __init__(self, fields: Dict[str, Any]):
+        self._fields = fields
+
+    def get(self, name: str, default=None):
+        return self._fields.get(name, default)
+
+
+class FakeHit:
+    def __init__(self, pk: int, distance: float, fields: Dict[str, Any]):
+        self.id = pk
+        self.distance = distance
+        self.entity = FakeEntity(fields)
+
+
+class FakeCollection:
+    def __init__(self, data_file: str = "format.json", latency: Optional[str] = None):
+        self.name = "fake_" + (os.getenv("COLLECTION_NAME") or os.getenv("MILVUS_COLLECTION") or "rules_qa")
+        self.median_ms, self.sigma = parse_latency(latency or os.getenv("FAKE_MILVUS_LATENCY_MS", "8,0.5"))
+        self.rows: List[Dict[str, Any]] = []
+
+        path = Path(data_file)
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for item in json.load(f):
+                    self.rows.append({
+                        "source": path.name,
+                        "header": item.get("header", ""),
+                        "context": item.get("context", ""),
+                    })
+        if not self.rows:
+            self.rows.append({"source": "fake.pdf", "header": "Sahte parça", "context": "Sahte yönetmelik metni."})
+
+    def load(self):
+        pass
+
+    @property
+    def num_entities(self) -> int:
+        return len(self.rows)
+
+    def _search_one(self, vec, limit: int, output_fields: List[str]) -> List[FakeHit]:
+        # aynı sorgu vektörü -> aynı sonuçlar (önbellek/replay testleri için deterministik)
+        seed = zlib.crc32(repr([round(float(x), 4) for x in list(vec)[:8]]).encode())
+        local = random.Random(seed)
+        idx = local.sample(range(len(self.rows)), k=min(limit, len(self.rows)))
+        scores = sorted((local.uniform(0.2, 0.8) for _ in idx), reverse=True)
+        return [
+            FakeHit(i, s, {k: v for k, v in self.rows[i].items() if k in output_fields})
+            for i, s in zip(idx, scores)
+        ]
+
+    def query(self, expr: str, output_fields=None, **kwargs) -> List[Dict[str, Any]]:
+        # sadece "id in [..]" biçimi (iki aşamalı retrieval'ın eksik id sorgusu)
+        ids = [int(x) for x in re.findall(r"-?\d+", expr)]
+        fields = output_fields or []
+        return [
+            dict({k: v for k, v in self.rows[i].items() if k in fields}, id=i)
+            for i in ids if 0 <= i < len(self.rows)
+        ]
+
+    def search(self, data, anns_field=None, param=None, limit=10, output_fields=None, **kwargs):
+        time.sleep(sample_latency_ms(self.median_ms, self.sigma, random.Random()) / 1000.0)
+        return [self._search_one(vec, limit, output_fields or []) for vec in data]
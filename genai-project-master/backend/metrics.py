@@ -0,0 +1,49 @@
+# backend/metrics.py
+"""
+Süreç içi basit metrikler (sayaçlar + süre gözlemleri), GET /metrics ile okunur.
+
+Her uvicorn worker'ı kendi sayaçlarını tutar; toplam için worker'lar ayrı ayrı okunmalı
+(ya da tek worker ile ölçülmeli). Dış bağımlılık yok, thread-safe.
+"""
+import threading
+from collections import defaultdict
+from typing import Any, Dict
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            t = self._timings.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            t["count"] += 1
+            t["sum"] += seconds
+            t["max"] = max(t["max"], seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {k: (int(v) if float(v).is_integer() else v) for k, v in self._counters.items()}
+            timings = {
+                k: {
+                    "count": t["count"],
+                    "avg_ms": round(t["sum"] / t["count"] * 1000, 1) if t["count"] else 0.0,
+                    "max_ms": round(t["max"] * 1000, 1),
+                }
+                for k, t in self._timings.items()
+            }
+        return {"counters": dict(sorted(counters.items())), "timings": dict(sorted(timings.items()))}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,172 @@
+# backend/prefilter.py
+"""
+Embedding'den önce yerel konu filtresi.
+
+Alakasız sorular (hava durumu, maç, ödev ...) eskiden ancak OpenAI embedding çağrısı + Milvus
+araması sonrası `best_score < MIN_SCORE` ile eleniyordu. Bu modül soruyu korpusun karakter
+n-gram profiliyle karşılaştırır ve açıkça alakasız olanları mikrosaniyeler içinde reddeder.
+
+Profil ingest sonunda koleksiyondaki parçalardan çıkarılır: en az `min_df` parçada geçen
+kelime içi karakter n-gram'ları (ör. " ders", "kayd", "ı "). Sorunun skoru, içerik
+kelimelerinin n-gram'larının profilde bulunma oranının ortalamasıdır (0-1). Türkçe eklerle
+çekimlenmiş kelimeler ("derslerimi") kökün n-gram'larını paylaştığı için yüksek skor alır.
+
+Sadece skor PREFILTER_REJECT_BELOW'un altındaysa reddedilir; arada kalan sorular normal
+retrieval'a gider ve MIN_SCORE filtresi yine çalışır. Eşik ayarı için:
+    python -m backend.prefilter score domain_profile.json "bugün hava nasıl"
+
+Oluşturma: ingest.py / bulk_import.py sonunda (DOMAIN_PROFILE_PATH boş değilse) veya
+    python -m backend.prefilter build <koleksiyon> <hedef_yol>
+"""
+import os
+import re
+import json
+import math
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.cache import normalize_question
+from backend.chunk_store import version_path
+
+DOMAIN_PROFILE_PATH = os.getenv("DOMAIN_PROFILE_PATH", "domain_profile.json").strip()
+PREFILTER_REJECT_BELOW = float(os.getenv("PREFILTER_REJECT_BELOW", "0.35"))  # 0 -> kapalı
+PREFILTER_NGRAM = int(os.getenv("PREFILTER_NGRAM", "4"))
+PREFILTER_MIN_DF = int(os.getenv("PREFILTER_MIN_DF", "2"))
+# büyük korpusta neredeyse her n-gram bir yerde geçer: eşik parça sayısıyla birlikte büyür
+PREFILTER_MIN_DF_RATIO = float(os.getenv("PREFILTER_MIN_DF_RATIO", "0.0005"))
+PREFILTER_MAX_NGRAMS = int(os.getenv("PREFILTER_MAX_NGRAMS", "200000"))
+
+# soru kalıpları ve bağlaçlar: her konuda geçer, skoru taşımamalı
+STOPWORDS = set("""
+ve veya ile için gibi kadar daha çok en bir bu şu o ne neden niye nasıl nedir nerede nereden
+hangi hangisi kaç kim mi mı mu mü de da ki ama fakat ise var yok olan olarak olur olmak
+ben sen biz siz onlar bana beni bize benim bizim acaba lütfen
+""".split())
+
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+def content_words(text: str) -> List[str]:
+    return [w for w in WORD_RE.findall(normalize_question(text)) if len(w) >= 3 and w not in STOPWORDS]
+
+
+def word_ngrams(word: str, n: int) -> set:
+    padded = f" {word} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+class ProfileBuilder:
+    """Parça metinlerinden belge frekansı (df) sayar; `build()` profil sözlüğünü döner."""
+
+    def __init__(self, n: int = PREFILTER_NGRAM):
+        self.n = n
+        self.df: Counter = Counter()
+        self.chunks = 0
+
+    def add(self, text: str):
+        grams = set()
+        for w in set(content_words(text)):
+            grams |= word_ngrams(w, self.n)
+        self.df.update(grams)
+        self.chunks += 1
+
+    def build(self, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        min_df = max(PREFILTER_MIN_DF, math.ceil(self.chunks * PREFILTER_MIN_DF_RATIO))
+        kept = [g for g, c in self.df.most_common(PREFILTER_MAX_NGRAMS) if c >= min_df]
+        return dict(meta or {}, n=self.n, chunks=self.chunks, min_df=min_df,
+                    created_at=int(time.time()), ngrams=sorted(kept))
+
+
+class DomainProfile:
+    def __init__(self, data: Dict[str, Any]):
+        self.meta = {k: v for k, v in data.items() if k != "ngrams"}
+        self.n = int(data["n"])
+        self.ngrams = frozenset(data["ngrams"])
+
+    def __len__(self) -> int:
+        return len(self.ngrams)
+
+    def score(self, text: str) -> Optional[float]:
+        """0-1 arası alan benzerliği; içerik kelimesi yoksa None (karar verilmez)."""
+        words = content_words(text)
+        if not words:
+            return None
+        total = 0.0
+        for w in words:
+            grams = word_ngrams(w, self.n)
+            total += len(grams & self.ngrams) / len(grams)
+        return total / len(words)
+
+    def is_off_topic(self, text: str, threshold: float = PREFILTER_REJECT_BELOW) -> bool:
+        score = self.score(text)
+        return score is not None and score < threshold
+
+
+def write_profile(path: str, texts: Iterable[str], meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    builder = ProfileBuilder()
+    for text in texts:
+        builder.add(text or "")
+    data = builder.build(meta)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+    return data
+
+
+def export_profile(collection, path: str) -> Dict[str, Any]:
+    from backend.chunk_store import iter_collection_rows
+
+    texts = (fields.get("context") for _, fields in iter_collection_rows(collection))
+    data = write_profile(path, texts, meta={"collection": collection.name})
+    print(f"🧭 Konu profili yazıldı: {path} ({len(data['ngrams'])} n-gram, {data['chunks']} parça)")
+    return data
+
+
+def load_profile(path: str) -> Optional[DomainProfile]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return DomainProfile(json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+def open_profile(collection_name: str) -> Optional[DomainProfile]:
+    """Blue/green: sürüme ait profil (<yol>.<koleksiyon>), yoksa tek profil; ikisi de yoksa None."""
+    if not DOMAIN_PROFILE_PATH or PREFILTER_REJECT_BELOW <= 0:
+        return None
+    profile = load_profile(version_path(DOMAIN_PROFILE_PATH, collection_name)) or load_profile(DOMAIN_PROFILE_PATH)
+    if profile is None:
+        print(f"ℹ️ Konu profili bulunamadı ({DOMAIN_PROFILE_PATH}); ön filtre kapalı.")
+    elif not len(profile):
+        print("⚠️ Konu profili boş; ön filtre kapalı.")
+        return None
+    return profile
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 4 and sys.argv[1] == "score":
+        profile = load_profile(sys.argv[2])
+        if profile is None:
+            raise SystemExit(f"❌ Profil bulunamadı: {sys.argv[2]}")
+        for question in sys.argv[3:]:
+            score = profile.score(question)
+            verdict = "-" if score is None else ("RED" if score < PREFILTER_REJECT_BELOW else "geçer")
+            print(f"{'-' if score is None else f'{score:.2f}'}\t{verdict}\t{question}")
+        raise SystemExit(0)
+
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        raise SystemExit(
+            "Kullanım: python -m backend.prefilter build <koleksiyon> <hedef_yol>\n"
+            "          python -m backend.prefilter score <profil_yolu> \"soru\" [\"soru\" ...]"
+        )
+
+    from pymilvus import connections, Collection
+
+    connections.connect(alias="default", host=os.getenv("MILVUS_HOST", "localhost"),
+                        port=os.getenv("MILVUS_PORT", "19530"))
+    col = Collection(sys.argv[2])
+    col.load()
+    export_profile(col, sys.argv[3])
@@ -0,0 +1,145 @@
+# backend/profiler.py
+"""
+Canlı worker'lar için örneklemeli profil (POST /admin/profile).
+
+Bir arka plan thread'i her `interval` saniyede sys._current_frames() ile tüm thread'lerin
+yığınlarını okur ve "collapsed stack" biçiminde sayar:
+
+    MainThread;uvicorn/main.py:run;...;backend/app.py:build_context_text 12
+
+Bu çıktı doğrudan flamegraph.pl, speedscope.app veya inferno ile açılabilir. Süre yerine
+`requests` verilirse oturum o kadar /chat isteği bitince kapanır. Worker yeniden başlatılmaz;
+oturum yokken hiçbir ek maliyet yoktur, açıkken yük örnekleme aralığıyla sınırlıdır.
+
+Beklemedeki thread'ler (kilit/kuyruk/select/soket okuma) varsayılan olarak sayılmaz; CPU'nun
+nereye gittiği görünsün diye. idle=True ile duvar saati profili alınır.
+"""
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Optional
+
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+
+# yaprak Python çerçevesi bunlardan biriyse thread CPU kullanmıyor, C'deki bir bekleme çağrısında
+# (lock.acquire, select, recv ...) duruyor. Sadece fonksiyon adına bakılmaz: uygulamadaki bir
+# "get" ya da "read" gerçekten CPU harcıyor olabilir -> (dosya yolu soneki, fonksiyon) çiftleri.
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("concurrent/futures/thread.py", "_worker"),
+    ("socket.py", "accept"),
+    ("socket.py", "readinto"),
+    ("ssl.py", "read"),
+    ("ssl.py", "recv"),
+    ("ssl.py", "recv_into"),
+    ("httpcore/_backends/sync.py", "read"),
+}
+
+_ROOTS = [p for p in sys.path if p] + [os.getcwd()]
+
+
+@lru_cache(maxsize=8192)
+def frame_label(code) -> str:
+    path = code.co_filename
+    if "site-packages" + os.sep in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    else:
+        for root in sorted(_ROOTS, key=len, reverse=True):
+            if path.startswith(root + os.sep):
+                path = path[len(root) + 1:]
+                break
+    return f"{path}:{code.co_name}"
+
+
+@lru_cache(maxsize=8192)
+def is_idle(code) -> bool:
+    path = code.co_filename.replace(os.sep, "/")
+    return any(code.co_name == name and (path == suffix or path.endswith("/" + suffix))
+               for suffix, name in IDLE_FRAMES)
+
+
+def thread_label(name: Optional[str]) -> str:
+    # "AnyIO worker thread", "batch_3" -> sayılar atılır ki aynı havuzun thread'leri birleşsin
+    return "".join(c for c in (name or "thread") if not c.isdigit()).rstrip("_- ") or "thread"
+
+
+class ProfileSession:
+    def __init__(self, seconds: float, requests: int = 0, interval: float = 0.005, idle: bool = False):
+        self.seconds = min(seconds, PROFILE_MAX_SECONDS)
+        self.max_requests = requests
+        self.interval = interval
+        self.idle = idle
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.requests = 0
+        self.started_at = time.time()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if not self.idle and is_idle(frame.f_code):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(thread_label(names.get(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def request_done(self):
+        self.requests += 1
+        if self.max_requests and self.requests >= self.max_requests:
+            self._stop.set()
+
+    def finished(self) -> bool:
+        if time.time() - self.started_at >= self.seconds:
+            self._stop.set()
+        return self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in self.counts.most_common()) + "\n"
+
+
+_active: Optional[ProfileSession] = None
+_lock = threading.Lock()
+
+
+def start(seconds: float, requests: int = 0, interval_ms: float = 5, idle: bool = False) -> ProfileSession:
+    global _active
+    with _lock:
+        if _active is not None:
+            raise RuntimeError("Zaten çalışan bir profil oturumu var.")
+        _active = ProfileSession(seconds, requests, max(interval_ms, 1) / 1000.0, idle)
+        _active._thread.start()
+        return _active
+
+
+def finish(session: ProfileSession):
+    global _active
+    session.stop()
+    with _lock:
+        if _active is session:
+            _active = None
+
+
+def request_done():
+    session = _active
+    if session is not None:
+        session.request_done()
@@ -0,0 +1,255 @@
+# backend/querylog.py
+"""
+Yapılandırılmış sorgu günlüğü + basit analiz (hangi sorular sık, hangileri reddediliyor, hangileri yavaş).
+
+İstek thread'i sadece bellekteki kuyruğa ekler (put_nowait, mikro saniyeler); arka plandaki
+yazıcı thread kuyruğu QUERY_LOG_BATCH'lik gruplar halinde boşaltır ve günlük dönen JSONL
+dosyalarına tek write() ile ekler:
+
+    <QUERY_LOG_DIR>/queries-2026-10-18.jsonl
+
+Satır: {"ts", "message", "history", "scope", "outcome", "best_score", "cache", "model",
+        "total_ms", "status"}
+outcome: answered | quick | no_context | rejected_prefilter | rejected_score | rejected_cached
+(önbellekten gelen ret cevabı) | cancelled | timeout | error
+
+Kuyruk doluysa (disk yavaş / takıldı) kayıt atılır ve querylog_dropped sayacı artar; istek
+hiçbir zaman beklemez. QUERY_LOG_KEEP_DAYS'ten eski dosyalar gün dönümünde silinir.
+
+Ayarlar (env):
+    QUERY_LOG_DIR=               boş -> kapalı
+    QUERY_LOG_QUEUE=10000        kuyruk kapasitesi
+    QUERY_LOG_BATCH=200          tek yazımdaki en fazla satır
+    QUERY_LOG_FLUSH_SECONDS=1    kuyruk boşken en geç bu kadar sürede yazılır
+    QUERY_LOG_KEEP_DAYS=30       0 -> silme
+
+Rapor: python manage.py analytics --days 7
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from backend.cache import normalize_question
+from backend.metrics import metrics
+
+QUERY_LOG_DIR = os.getenv("QUERY_LOG_DIR", "").strip()
+QUERY_LOG_QUEUE = int(os.getenv("QUERY_LOG_QUEUE", "10000"))
+QUERY_LOG_BATCH = int(os.getenv("QUERY_LOG_BATCH", "200"))
+QUERY_LOG_FLUSH_SECONDS = float(os.getenv("QUERY_LOG_FLUSH_SECONDS", "1"))
+QUERY_LOG_KEEP_DAYS = int(os.getenv("QUERY_LOG_KEEP_DAYS", "30"))
+
+FIELDS = ["ts", "message", "history", "scope", "outcome", "best_score", "cache", "model", "total_ms", "status"]
+PREFIX = "queries-"
+
+
+def enabled() -> bool:
+    return bool(QUERY_LOG_DIR)
+
+
+def log_path(directory: str, day: str) -> str:
+    return os.path.join(directory, f"{PREFIX}{day}.jsonl")
+
+
+class QueryLogWriter:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=QUERY_LOG_QUEUE)
+        self.day = ""
+        self._fd: Optional[int] = None
+        self._thread = threading.Thread(target=self._run, name="querylog", daemon=True)
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread.start()
+
+    def put(self, entry: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            metrics.incr("querylog_dropped")
+
+    def stop(self, timeout: float = 5.0):
+        # kalan kayıtlar yazılsın: None -> yazıcı kuyruğu boşaltıp çıkar
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            batch: List[Dict[str, Any]] = []
+            stop = False
+            try:
+                item = self.queue.get(timeout=QUERY_LOG_FLUSH_SECONDS)
+                while True:
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= QUERY_LOG_BATCH:
+                        break
+                    item = self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    self._write(batch)
+                except OSError as e:
+                    metrics.incr("querylog_dropped", len(batch))
+                    print("⚠️ Sorgu günlüğü yazılamadı:", e)
+            if stop:
+                return
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        by_day: Dict[str, List[str]] = defaultdict(list)
+        for entry in batch:
+            day = time.strftime("%Y-%m-%d", time.localtime(entry.get("ts") or time.time()))
+            by_day[day].append(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+        rotated = False
+        for day, lines in sorted(by_day.items()):
+            if day != self.day:
+                self._rotate(day)
+                rotated = True
+            os.write(self._fd, ("\n".join(lines) + "\n").encode("utf-8"))
+        metrics.incr("querylog_written", len(batch))
+        # temizlik kayıtlar yazıldıktan sonra: burada bir hata batch'i kaybettirmez
+        if rotated:
+            self._cleanup(self.day)
+
+    def _rotate(self, day: str):
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(log_path(self.directory, day), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.day = day
+
+    def _cleanup(self, day: str):
+        if QUERY_LOG_KEEP_DAYS <= 0:
+            return
+        oldest = (date.fromisoformat(day) - timedelta(days=QUERY_LOG_KEEP_DAYS)).isoformat()
+        for name in list_days(self.directory):
+            if name < oldest:
+                try:
+                    os.remove(log_path(self.directory, name))
+                except FileNotFoundError:
+                    pass  # aynı gün dönümünde başka bir worker sildi
+                except OSError as e:
+                    print("⚠️ Eski sorgu günlüğü silinemedi:", e)
+
+
+_writer: Optional[QueryLogWriter] = None
+_lock = threading.Lock()
+
+
+def get_writer() -> QueryLogWriter:
+    global _writer
+    with _lock:
+        if _writer is None:
+            _writer = QueryLogWriter(QUERY_LOG_DIR)
+            _writer.start()
+            atexit.register(_writer.stop)
+        return _writer
+
+
+def log(data: Dict[str, Any]):
+    """İstek özetini kuyruğa ekler (beklemez). `data`: recorder izinin alanları."""
+    if enabled():
+        get_writer().put({k: data.get(k) for k in FIELDS})
+
+
+def stop():
+    if _writer is not None:
+        _writer.stop()
+
+
+# -----------------------
+# ANALİZ
+# -----------------------
+def list_days(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(n[len(PREFIX):-len(".jsonl")] for n in os.listdir(directory)
+                  if n.startswith(PREFIX) and n.endswith(".jsonl"))
+
+
+def iter_entries(directory: str, days: int = 7) -> Iterator[Dict[str, Any]]:
+    since = (date.today() - timedelta(days=days - 1)).isoformat() if days > 0 else ""
+    for day in list_days(directory):
+        if day < since:
+            continue
+        with open(log_path(directory, day), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # yazılırken kesilmiş son satır
+                entry["day"] = day
+                yield entry
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s) - 1, max(0, int(round(p / 100 * (len(s) - 1)))))]
+
+
+def is_rejected(entry: Dict[str, Any]) -> bool:
+    return (entry.get("outcome") or "").startswith("rejected")
+
+
+def daily_stats(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    by_day: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for e in entries:
+        by_day[e["day"]].append(e)
+    rows = []
+    for day, items in sorted(by_day.items()):
+        n = len(items)
+        latencies = [e["total_ms"] for e in items if e.get("total_ms") is not None and e.get("status") == "ok"]
+        rows.append({
+            "day": day,
+            "requests": n,
+            "rejected": round(sum(1 for e in items if is_rejected(e)) / n, 4),
+            "prefilter": round(sum(1 for e in items if e.get("outcome") == "rejected_prefilter") / n, 4),
+            "cached": round(sum(1 for e in items if e.get("cache") in ("answer", "answer_memo")) / n, 4),
+            "errors": round(sum(1 for e in items if e.get("status") != "ok") / n, 4),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p90_ms": round(percentile(latencies, 90), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+        })
+    return rows
+
+
+def top_questions(entries: List[Dict[str, Any]], n: int = 20, rejected: Optional[bool] = None) -> List[Dict[str, Any]]:
+    groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for e in entries:
+        if e.get("outcome") == "quick" or (rejected is not None and is_rejected(e) != rejected):
+            continue
+        groups[normalize_question(e.get("message") or "")].append(e)
+    rows = []
+    for question, items in groups.items():
+        scores = [e["best_score"] for e in items if e.get("best_score") is not None]
+        outcomes = Counter(e.get("outcome") for e in items)
+        rows.append({
+            "question": question,
+            "count": len(items),
+            "best_score": round(sum(scores) / len(scores), 4) if scores else None,
+            "outcome": outcomes.most_common(1)[0][0],
+        })
+    rows.sort(key=lambda r: r["count"], reverse=True)
+    return rows[:n]
+
+
+def slowest_questions(entries: List[Dict[str, Any]], n: int = 20) -> List[Dict[str, Any]]:
+    # önbellekten gelenler hızlı olduğu için sadece gerçekten hesaplanan cevaplar
+    items = [e for e in entries if e.get("status") == "ok" and e.get("outcome") == "answered"
+             and e.get("cache") not in ("answer", "answer_memo")]
+    items.sort(key=lambda e: e.get("total_ms") or 0.0, reverse=True)
+    return [{"question": e.get("message"), "total_ms": e.get("total_ms"), "day": e["day"],
+             "model": e.get("model")} for e in items[:n]]
@@ -0,0 +1,154 @@
+# backend/recorder.py
+"""
+/chat trafik kaydı (performans regresyonlarını yeniden üretmek için, isteğe bağlı).
+
+RECORD_PATH ayarlıysa örneklenen her istek için JSONL dosyasına tek satır yazılır:
+
+    {"ts":1760000000.123,"rid":null,"message":"ders kaydı ne zaman","history":2,"scope":[],
+     "ids":[41,7,19],"scores":[0.6123,0.5802,0.5511],"outcome":"answered","best_score":0.6123,
+     "cache":null,"model":["gpt-4o-mini"],
+     "stages":{"prefilter":0.02,"embed":151.3,"search":8.4,"fetch":0.3,"llm":1802.5},
+     "total_ms":1965.1,"status":"ok"}
+
+stages: aşama süreleri (ms; aynı aşama birden çok çalıştıysa toplamı), cache: "answer" /
+"answer_memo" / "search" isabeti ya da "prefilter" (konu filtresi reddi), status: ok |
+cancelled | timeout | error. Kayıt loadtest/replay.py ile yeni
+bir sürüme karşı yeniden oynatılır ve iki kayıt karşılaştırılır.
+
+Ayarlar (env):
+    RECORD_PATH=                 boş -> kapalı
+    RECORD_SAMPLE_RATE=1.0       kaydedilecek isteklerin oranı
+    RECORD_MAX_MB=100            dosya bu boyutu geçince kayıt durur
+
+Aynı iz (örneklemeden bağımsız) backend/querylog.py'ye de özet olarak verilir; QUERY_LOG_DIR
+ayarlıysa her istek için iz tutulur ama bu dosyaya sadece örneklenenler yazılır.
+
+Not: kullanıcı mesajları olduğu gibi yazılır; dosyayı buna göre sakla. Her satır O_APPEND ile
+tek write() çağrısıyla yazılır, aynı dosyaya birden çok worker yazabilir.
+"""
+import os
+import json
+import time
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from backend import querylog
+
+RECORD_PATH = os.getenv("RECORD_PATH", "").strip()
+RECORD_SAMPLE_RATE = float(os.getenv("RECORD_SAMPLE_RATE", "1.0"))
+RECORD_MAX_MB = float(os.getenv("RECORD_MAX_MB", "100"))
+
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("record_trace", default=None)
+_fd: Optional[int] = None
+_full = False
+_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self, message: str, history: int, scope: Optional[List[str]], rid: Optional[str],
+                 sampled: bool = True):
+        self.t0 = time.perf_counter()
+        self.sampled = sampled
+        self.data: Dict[str, Any] = {
+            "ts": round(time.time(), 3),
+            "rid": rid,
+            "message": message,
+            "history": history,
+            "scope": sorted(scope or []),
+            "ids": [],
+            "scores": [],
+            "outcome": None,
+            "best_score": None,
+            "cache": None,
+            "model": [],
+            "stages": {},
+        }
+
+    def add_stage(self, name: str, seconds: float):
+        stages = self.data["stages"]
+        stages[name] = round(stages.get(name, 0.0) + seconds * 1000, 2)
+
+
+def enabled() -> bool:
+    return bool(RECORD_PATH) and not _full
+
+
+def write(data: Dict[str, Any]):
+    global _fd, _full
+    with _lock:
+        if _fd is None:
+            _fd = os.open(RECORD_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    if os.fstat(_fd).st_size > RECORD_MAX_MB * 1024 * 1024:
+        _full = True
+        print(f"⚠️ {RECORD_PATH} RECORD_MAX_MB ({RECORD_MAX_MB:g}) sınırını geçti; trafik kaydı durdu.")
+        return
+    os.write(_fd, (json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"))
+
+
+@contextmanager
+def record(message: str, history: int, scope: Optional[List[str]] = None, rid: Optional[str] = None):
+    """İsteği (örneklenirse) kaydeder; içinde çağrılan stage()/note() bu kayda yazar."""
+    sampled = enabled() and random.random() < RECORD_SAMPLE_RATE
+    if not sampled and not querylog.enabled():
+        yield None
+        return
+
+    trace = Trace(message, history, scope, rid, sampled)
+    token = _current.set(trace)
+    status = "ok"
+    try:
+        yield trace
+    except BaseException as e:
+        name = type(e).__name__
+        status = "cancelled" if name == "RequestCancelled" else "timeout" if "Timeout" in name else "error"
+        raise
+    finally:
+        _current.reset(token)
+        trace.data["total_ms"] = round((time.perf_counter() - trace.t0) * 1000, 2)
+        trace.data["status"] = status
+        if status != "ok":
+            trace.data["outcome"] = status
+        querylog.log(trace.data)
+        if trace.sampled:
+            try:
+                write(trace.data)
+            except OSError as e:
+                print("⚠️ Trafik kaydı yazılamadı:", e)
+
+
+@contextmanager
+def stage(name: str):
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_stage(name, time.perf_counter() - t0)
+
+
+def add_stage(name: str, seconds: float):
+    trace = _current.get()
+    if trace is not None:
+        trace.add_stage(name, seconds)
+
+
+def note(**fields):
+    trace = _current.get()
+    if trace is None:
+        return
+    for key, value in fields.items():
+        if isinstance(trace.data.get(key), list) and not isinstance(value, list):
+            trace.data[key].append(value)
+        else:
+            trace.data[key] = value
+
+
+def note_hits(hits: List[Dict[str, Any]]):
+    if _current.get() is not None:
+        note(ids=[h["id"] for h in hits], scores=[round(float(h.get("score", 0.0)), 4) for h in hits])
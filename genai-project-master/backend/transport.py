@@ -0,0 +1,173 @@
+# backend/transport.py
+"""
+OpenAI çağrıları için paylaşılan HTTP taşıma katmanı.
+
+Tüm OpenAI istemcileri tek bir httpx.Client (bağlantı havuzu, keep-alive, isteğe bağlı HTTP/2)
+üzerinden gider; çağrı türüne göre (embedding / chat) ayrı bağlantı ve okuma zaman aşımları
+uygulanır. Takılan bir upstream worker'ı dakikalarca tutmaz: okuma zaman aşımı, akışlı
+chat'te iki parça arasındaki en uzun bekleme demektir.
+
+Zaman aşımı deneme başınadır: en kötü bekleme ~ (max_retries + 1) x okuma zaman aşımı + geri
+çekilme. Bu yüzden chat varsayılan olarak yeniden denenmez (CHAT_MAX_RETRIES=0; kullanıcı zaten
+bekliyor, 504 alıp yeniden sorabilir); embedding kısa ve idempotent olduğu için bir kez denenir.
+
+Toplu işler (ingest.py, bulk_import.py) "ingest" türünü kullanır: kimse cevap beklemiyor, tek bir
+429 dalgası ya da yavaş bir 64'lük batch uzun bir yüklemeyi yarıda kesip koleksiyonu yarım
+bırakmasın diye uzun okuma zaman aşımı ve çok deneme (SDK 429/5xx'te geri çekilerek tekrar dener).
+
+Ayarlar (env):
+    OPENAI_POOL_SIZE=100            en fazla açık bağlantı
+    OPENAI_KEEPALIVE=20             boşta tutulan bağlantı
+    OPENAI_KEEPALIVE_EXPIRY=30      boştaki bağlantının ömrü (sn)
+    OPENAI_POOL_TIMEOUT=5           havuzda boş bağlantı bekleme (sn)
+    OPENAI_HTTP2=false              true -> HTTP/2 (h2 paketi gerekir)
+    EMBED_MAX_RETRIES=1       CHAT_MAX_RETRIES=0
+    INGEST_CONNECT_TIMEOUT=10 INGEST_READ_TIMEOUT=120 INGEST_MAX_RETRIES=8
+    EMBED_CONNECT_TIMEOUT=3   EMBED_READ_TIMEOUT=10
+    CHAT_CONNECT_TIMEOUT=3    CHAT_READ_TIMEOUT=30
+    OPENAI_PREWARM=2                başlangıçta açılacak bağlantı sayısı (0 = kapalı)
+
+Yerel sahte sunucuyla doğrulama: OPENAI_BASE_URL=http://127.0.0.1:8799/v1 ve
+loadtest/fake_openai.py'de FAKE_HANG_RATE (takılan istek oranı).
+"""
+import os
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import httpx
+
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "100"))
+OPENAI_KEEPALIVE = int(os.getenv("OPENAI_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+OPENAI_POOL_TIMEOUT = float(os.getenv("OPENAI_POOL_TIMEOUT", "5"))
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "false").lower() == "true"
+MAX_RETRIES = {
+    "embed": int(os.getenv("EMBED_MAX_RETRIES", "1")),
+    "chat": int(os.getenv("CHAT_MAX_RETRIES", "0")),
+    "ingest": int(os.getenv("INGEST_MAX_RETRIES", "8")),
+}
+OPENAI_PREWARM = int(os.getenv("OPENAI_PREWARM", "2"))
+
+TIMEOUTS = {
+    "embed": httpx.Timeout(
+        float(os.getenv("EMBED_READ_TIMEOUT", "10")),
+        connect=float(os.getenv("EMBED_CONNECT_TIMEOUT", "3")),
+        pool=OPENAI_POOL_TIMEOUT,
+    ),
+    "chat": httpx.Timeout(
+        float(os.getenv("CHAT_READ_TIMEOUT", "30")),
+        connect=float(os.getenv("CHAT_CONNECT_TIMEOUT", "3")),
+        pool=OPENAI_POOL_TIMEOUT,
+    ),
+    "ingest": httpx.Timeout(
+        float(os.getenv("INGEST_READ_TIMEOUT", "120")),
+        connect=float(os.getenv("INGEST_CONNECT_TIMEOUT", "10")),
+        pool=None,  # EMBED_THREADS kadar eşzamanlı istek; havuz beklemesi hata sayılmaz
+    ),
+}
+
+_http_client: Optional[httpx.Client] = None
+_base_client = None
+_http2 = False
+_lock = threading.Lock()
+
+
+def http2_enabled() -> bool:
+    if OPENAI_HTTP2 and importlib.util.find_spec("h2") is None:
+        print("⚠️ OPENAI_HTTP2=true ama 'h2' paketi yok (pip install httpx[http2]); HTTP/1.1 kullanılıyor.")
+        return False
+    return OPENAI_HTTP2
+
+
+def get_http_client() -> httpx.Client:
+    global _http_client, _http2
+    with _lock:
+        if _http_client is None:
+            _http2 = http2_enabled()
+            _http_client = httpx.Client(
+                http2=_http2,
+                limits=httpx.Limits(
+                    max_connections=OPENAI_POOL_SIZE,
+                    max_keepalive_connections=OPENAI_KEEPALIVE,
+                    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+                ),
+                timeout=TIMEOUTS["chat"],
+            )
+        return _http_client
+
+
+def openai_client(kind: str = "chat"):
+    """Paylaşılan havuzu kullanan, `kind` ("embed" | "chat" | "ingest") zaman aşımlı OpenAI istemcisi."""
+    global _base_client
+    from openai import OpenAI
+
+    if kind not in TIMEOUTS:
+        raise ValueError(f"Bilinmeyen çağrı türü: {kind} (embed | chat | ingest)")
+    http_client = get_http_client()
+    with _lock:
+        if _base_client is None:
+            _base_client = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY", "").strip(),
+                http_client=http_client,
+            )
+    # with_options kopyası aynı http_client'ı (havuzu) kullanır
+    return _base_client.with_options(timeout=TIMEOUTS[kind], max_retries=MAX_RETRIES[kind])
+
+
+def prewarm(n: int = OPENAI_PREWARM):
+    """n bağlantıyı önceden açar (TCP + TLS); ilk kullanıcı isteği el sıkışma beklemez."""
+    if n <= 0:
+        return
+    client = openai_client("embed")
+
+    def touch(_):
+        client.models.list()
+
+    try:
+        with ThreadPoolExecutor(max_workers=n, thread_name_prefix="prewarm") as pool:
+            list(pool.map(touch, range(n)))
+        print(f"🔥 OpenAI bağlantıları ısıtıldı: {pool_stats().get('open', '?')} açık")
+    except Exception as e:
+        print("⚠️ OpenAI bağlantı ısıtma başarısız:", e)
+
+
+def pool_introspection_supported() -> bool:
+    # havuz doluluğu httpx/httpcore'un özel alanlarından okunur (HTTPTransport._pool,
+    # ConnectionPool._requests); sadece denenmiş sürümlerde (httpx 0.x + httpcore 1.x)
+    try:
+        from importlib.metadata import version
+        httpx_major = int(version("httpx").split(".")[0])
+        httpcore_major = int(version("httpcore").split(".")[0])
+    except Exception:
+        return False
+    return httpx_major == 0 and httpcore_major == 1
+
+
+POOL_INTROSPECTION = pool_introspection_supported()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Havuz durumu (/metrics, warmup). Desteklenmeyen httpx/httpcore sürümünde sadece ayarlar döner
+    (open/active/idle/waiting yok; ısıtma havuz doluluğuna bakmadan hız sınırıyla çalışır).
+    """
+    stats: Dict[str, Any] = {"max_connections": OPENAI_POOL_SIZE, "http2": _http2}
+    if _http_client is None or not POOL_INTROSPECTION:
+        return stats
+    try:
+        pool = _http_client._transport._pool
+        connections = list(pool.connections)
+        idle = sum(1 for c in connections if c.is_idle())
+        active = len(connections) - idle
+        stats.update(
+            open=len(connections),
+            active=active,
+            idle=idle,
+            waiting=max(0, len(pool._requests) - active),
+            utilization=round(active / OPENAI_POOL_SIZE, 4) if OPENAI_POOL_SIZE else 0.0,
+        )
+    except AttributeError:
+        pass
+    return stats
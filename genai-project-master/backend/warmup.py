@@ -0,0 +1,182 @@
+# backend/warmup.py
+"""
+Önbellek ısıtma: deploy / yeniden ingest (alias geçişi) sonrası sık soruların embedding,
+retrieval ve cevaplarını arka planda önceden hesaplar; ilk öğrenci dalgası boş önbelleğe düşmez.
+
+Sorular (tekrarlar normalize edilerek atılır, en fazla WARMUP_TOP):
+- WARMUP_QUESTIONS_FILE: .txt (satır başına soru) ya da JSON liste (metin veya {"question": ...})
+- WARMUP_FROM_QUERY_LOG=true ise sorgu günlüğünden (QUERY_LOG_DIR) son WARMUP_LOG_DAYS günün en
+  sık cevaplanan soruları
+
+Canlı trafikle yarışmaması için:
+- tek thread, sırayla ve en fazla WARMUP_RATE soru/sn,
+- OpenAI havuzunda WARMUP_MAX_ACTIVE'den fazla aktif bağlantı varsa (yoğun an) bekler,
+- önbellekte zaten olan sorular atlanır; CACHE_BACKEND=sqlite ise aynı makinede tek worker ısıtır
+  (diğerleri aynı önbelleği paylaşır),
+- yeni bir ısıtma (ör. başlangıçtan hemen sonra alias geçişi) eskisini durdurur.
+
+Ayarlar (env):
+    WARMUP=true                      false -> kapalı
+    WARMUP_QUESTIONS_FILE=
+    WARMUP_FROM_QUERY_LOG=true
+    WARMUP_LOG_DAYS=7
+    WARMUP_TOP=100
+    WARMUP_RATE=0.5                  soru / sn
+    WARMUP_MAX_ACTIVE=4              havuzda bu kadar aktif bağlantı varsa bekle
+    WARMUP_DELAY_SECONDS=5           başlangıçtan sonra bekleme
+    WARMUP_ANSWERS=false             true -> cevaplar da hesaplanır (soru başına bir LLM çağrısı)
+
+Varsayılan ısıtma sadece embedding + retrieval'dır: cevap ısıtma her deploy / geçişte LLM
+ücreti öder ve sadece geçmişsiz, kapsamsız (scope'suz) isteklerin okuduğu "answer" kaydını
+doldurur. Widget trafiği çoğunlukla bunlara denk geliyorsa (sorgu günlüğünde cache="answer"
+oranı) WARMUP_ANSWERS=true ile açılabilir.
+"""
+import os
+import json
+import time
+import threading
+from typing import Callable, List, Optional
+
+from backend import querylog, transport
+from backend.cache import normalize_question
+from backend.metrics import metrics
+
+WARMUP = os.getenv("WARMUP", "true").lower() == "true"
+WARMUP_QUESTIONS_FILE = os.getenv("WARMUP_QUESTIONS_FILE", "").strip()
+WARMUP_FROM_QUERY_LOG = os.getenv("WARMUP_FROM_QUERY_LOG", "true").lower() == "true"
+WARMUP_LOG_DAYS = int(os.getenv("WARMUP_LOG_DAYS", "7"))
+WARMUP_TOP = int(os.getenv("WARMUP_TOP", "100"))
+WARMUP_RATE = float(os.getenv("WARMUP_RATE", "0.5"))
+WARMUP_MAX_ACTIVE = int(os.getenv("WARMUP_MAX_ACTIVE", "4"))
+WARMUP_DELAY_SECONDS = float(os.getenv("WARMUP_DELAY_SECONDS", "5"))
+WARMUP_ANSWERS = os.getenv("WARMUP_ANSWERS", "false").lower() == "true"
+
+
+def load_file_questions(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return [item["question"] if isinstance(item, dict) else str(item) for item in json.load(f)]
+        return [line.strip() for line in f if line.strip()]
+
+
+def load_questions(top: int = WARMUP_TOP) -> List[str]:
+    questions: List[str] = []
+    if WARMUP_QUESTIONS_FILE:
+        try:
+            questions += load_file_questions(WARMUP_QUESTIONS_FILE)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ WARMUP_QUESTIONS_FILE okunamadı ({WARMUP_QUESTIONS_FILE}):", e)
+    if WARMUP_FROM_QUERY_LOG and querylog.enabled():
+        entries = list(querylog.iter_entries(querylog.QUERY_LOG_DIR, WARMUP_LOG_DAYS))
+        questions += [r["question"] for r in querylog.top_questions(entries, top, rejected=False)]
+
+    seen = set()
+    unique = []
+    for q in questions:
+        key = normalize_question(q)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(q)
+    return unique[:top]
+
+
+def pool_busy() -> bool:
+    return transport.pool_stats().get("active", 0) >= WARMUP_MAX_ACTIVE
+
+
+def machine_lock(path: str):
+    """Aynı makinedeki worker'lardan sadece biri ısıtsın (paylaşımlı önbellek). Alınamazsa None."""
+    try:
+        import fcntl
+    except ImportError:
+        return True
+    f = open(path, "w")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+class WarmupJob:
+    def __init__(self, warm_one: Callable[[str, bool], bool], reason: str, delay: float, lock_path: Optional[str]):
+        self.warm_one = warm_one
+        self.reason = reason
+        self.delay = delay
+        self.lock_path = lock_path
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        if self._stop.wait(self.delay):
+            return
+        lock = machine_lock(self.lock_path) if self.lock_path else True
+        # bu süreçte durdurulan önceki ısıtma kilidi birazdan bırakır
+        for _ in range(10):
+            if lock is not None or self._stop.wait(1.0):
+                break
+            lock = machine_lock(self.lock_path)
+        if lock is None:
+            print(f"ℹ️ Önbellek ısıtma ({self.reason}) başka bir worker'da çalışıyor; atlandı.")
+            return
+        try:
+            self._warm()
+        finally:
+            if lock is not True:
+                lock.close()
+
+    def _warm(self):
+        questions = load_questions()
+        if not questions:
+            return
+        t0 = time.time()
+        warmed = skipped = errors = 0
+        interval = 1.0 / WARMUP_RATE if WARMUP_RATE > 0 else 0.0
+        for q in questions:
+            # yoğun anda canlı trafiğe yer aç
+            while pool_busy() and not self._stop.is_set():
+                self._stop.wait(1.0)
+            if self._stop.is_set():
+                break
+            started = time.time()
+            try:
+                if self.warm_one(q, WARMUP_ANSWERS):
+                    warmed += 1
+                    metrics.incr("warmup_questions")
+                else:
+                    skipped += 1
+                    metrics.incr("warmup_skipped")
+            except Exception as e:
+                errors += 1
+                metrics.incr("warmup_errors")
+                print(f"⚠️ Isıtma hatası ({q[:60]}):", e)
+            if self._stop.wait(max(0.0, interval - (time.time() - started))):
+                break
+        state = "durduruldu" if self._stop.is_set() else "bitti"
+        print(f"🔥 Önbellek ısıtma ({self.reason}) {state}: {warmed} soru ısıtıldı, {skipped} zaten hazırdı, "
+              f"{errors} hata ({time.time() - t0:.0f} sn)")
+
+
+_job: Optional[WarmupJob] = None
+_lock = threading.Lock()
+
+
+def start(warm_one: Callable[[str, bool], bool], reason: str, delay: float = 0.0,
+          lock_path: Optional[str] = None) -> Optional[WarmupJob]:
+    """
+    Arka planda ısıtmayı başlatır (beklemez). `warm_one(soru, cevap_da)` soruyu önbelleğe
+    hesaplar; zaten önbellekteyse False döner. Çalışan bir ısıtma varsa durdurulur.
+    """
+    global _job
+    if not WARMUP:
+        return None
+    with _lock:
+        if _job is not None:
+            _job.stop()
+        _job = WarmupJob(warm_one, reason, delay, lock_path)
+        _job._thread.start()
+        return _job
@@ -0,0 +1,199 @@
+"""
+Büyük ingest'ler için Milvus bulk import yolu.
+
+Satırlar collection.insert yerine kolon bazlı dosyalara (Parquet veya NumPy) yazılır ve
+Milvus'un kullandığı MinIO bucket'ına yüklenir; ardından sunucu tarafı bulk insert başlatılır,
+ilerlemesi izlenir ve vektör index'i en sonda tek seferde kurulur.
+
+İki kullanım:
+    BULK_IMPORT=true python ingest.py                   # DOCS_DIR -> embed -> bulk import
+    python bulk_import.py updated_format.json           # hazır vektörlü JSON export'ları
+
+JSON export formatı (updated_format.json): [{"header", "context", "vector_context"}, ...]
+Vektörler koleksiyonun EMBED_MODEL / VECTOR_DIM ayarıyla üretilmiş olmalı.
+"""
+import os
+import sys
+import json
+import time
+
+from dotenv import load_dotenv
+from tqdm import tqdm
+from pymilvus import connections, utility
+
+import ingest
+
+load_dotenv()
+
+# -----------------------
+# CONFIG
+# -----------------------
+# docker-compose.yml'deki MinIO (Milvus'un varsayılan bucket'ı: a-bucket)
+MINIO_ADDRESS = os.getenv("MINIO_ADDRESS", "localhost:9000")
+MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
+MINIO_SECRET_KEY = os.getenv("MINIO_SECRET_KEY", "minioadmin")
+MINIO_BUCKET = os.getenv("MINIO_BUCKET", "a-bucket")
+MINIO_SECURE = os.getenv("MINIO_SECURE", "false").lower() == "true"
+
+BULK_FILE_TYPE = os.getenv("BULK_FILE_TYPE", "parquet").lower()  # parquet | numpy
+BULK_REMOTE_PATH = os.getenv("BULK_REMOTE_PATH", "bulk_data")
+BULK_LOCAL_PATH = os.getenv("BULK_LOCAL_PATH", "volumes/bulk_data")
+BULK_CHUNK_MB = int(os.getenv("BULK_CHUNK_MB", "256"))
+BULK_POLL_SECONDS = float(os.getenv("BULK_POLL_SECONDS", "2"))
+
+
+# -----------------------
+# WRITER
+# -----------------------
+def open_writer(schema):
+    from pymilvus.bulk_writer import RemoteBulkWriter, BulkFileType
+
+    file_types = {"parquet": BulkFileType.PARQUET, "numpy": BulkFileType.NUMPY}
+    if BULK_FILE_TYPE not in file_types:
+        raise RuntimeError(f"BULK_FILE_TYPE='{BULK_FILE_TYPE}' desteklenmiyor (parquet | numpy).")
+
+    connect_param = RemoteBulkWriter.S3ConnectParam(
+        endpoint=MINIO_ADDRESS,
+        access_key=MINIO_ACCESS_KEY,
+        secret_key=MINIO_SECRET_KEY,
+        bucket_name=MINIO_BUCKET,
+        secure=MINIO_SECURE,
+    )
+    return RemoteBulkWriter(
+        schema=schema,
+        remote_path=BULK_REMOTE_PATH,
+        local_path=BULK_LOCAL_PATH,
+        connect_param=connect_param,
+        file_type=file_types[BULK_FILE_TYPE],
+        chunk_size=BULK_CHUNK_MB * 1024 * 1024,
+    )
+
+
+def write_rows(writer, row_batches, field_names, total=None):
+    count = 0
+    with tqdm(total=total, desc=f"Bulk dosyaları ({BULK_FILE_TYPE})") as bar:
+        for rows in row_batches:
+            for row in rows:
+                writer.append_row({k: v for k, v in row.items() if k in field_names})
+            count += len(rows)
+            bar.update(len(rows))
+    writer.commit()
+    return count
+
+
+# -----------------------
+# IMPORT
+# -----------------------
+def run_import(collection_name, batch_files):
+    task_ids = [utility.do_bulk_insert(collection_name=collection_name, files=files) for files in batch_files]
+    print(f"🚚 {len(task_ids)} bulk insert görevi başlatıldı")
+
+    pending = set(task_ids)
+    imported = 0
+    while pending:
+        time.sleep(BULK_POLL_SECONDS)
+        for task_id in sorted(pending):
+            state = utility.get_bulk_insert_state(task_id=task_id)
+            if state.state_name == "Failed":
+                raise RuntimeError(f"Bulk insert başarısız (task {task_id}): {state.failed_reason}")
+            if state.state_name == "Completed":
+                pending.discard(task_id)
+                imported += state.row_count
+                print(f"   ✔ task {task_id}: {state.row_count} satır")
+            else:
+                print(f"   … task {task_id}: {state.state_name} %{state.progress}")
+    return imported
+
+
+def build_index_and_load(collection):
+    if len(collection.indexes) == 0:
+        ingest.create_vector_index(collection)
+    utility.wait_for_index_building_complete(collection.name)
+    collection.load()
+
+
+def bulk_ingest(collection, row_batches, total=None):
+    """Satır gruplarını bulk dosyalarına yazar, sunucu tarafı import eder ve index'i en sonda kurar."""
+    field_names = {f.name for f in collection.schema.fields if not f.auto_id}
+
+    with open_writer(collection.schema) as writer:
+        written = write_rows(writer, row_batches, field_names, total=total)
+        batch_files = writer.batch_files
+
+    if not written:
+        # çağıran (ingest.main / main) parça deposu + alias geçişine devam etmesin
+        ingest.abort_empty_ingest(collection, build_index=build_index_and_load)
+
+    imported = run_import(collection.name, batch_files)
+    build_index_and_load(collection)
+    print(f"📌 Bulk import: {imported} satır yüklendi ({written} yazıldı)")
+    return imported
+
+
+# -----------------------
+# PRECOMPUTED VECTORS (JSON EXPORT)
+# -----------------------
+def load_json_records(paths):
+    """JSON export'larını okur -> [(source, header, context, sources, vector)] (DEDUP=true ise kopyalar birleşir)"""
+    dd = ingest.Deduplicator() if ingest.DEDUP else None
+    records = []
+    dropped = 0
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+
+        source = os.path.basename(path)
+        category = ingest.derive_category(source)
+        for i, item in enumerate(items, start=1):
+            vector = item.get("vector_context")
+            if not vector:
+                continue
+            if len(vector) != ingest.VECTOR_DIM:
+                raise RuntimeError(
+                    f"{source}: {i}. kaydın vektör boyutu {len(vector)}, VECTOR_DIM={ingest.VECTOR_DIM} bekleniyor."
+                )
+            header = item.get("header") or f"{source} - Parça {i}"
+            context = item.get("context", "")
+
+            # kategori içinde: canonical satırın category'si diğer fakültelerin scope'unu da karşılamaz
+            canonical = dd.add(context, category) if dd else None
+            if canonical is not None:
+                dropped += 1
+                if source not in records[canonical][3]:
+                    records[canonical][3].append(source)
+                continue
+            records.append((source, header, context, [source], vector))
+
+    if dd:
+        print(f"🧬 Dedup: {dropped} kopya kayıt elendi, {len(records)} benzersiz kayıt kaldı")
+    return records
+
+
+def iter_record_rows(records, batch_size=ingest.BATCH_SIZE):
+    for start in range(0, len(records), batch_size):
+        yield [
+            ingest.make_row(source, header, context, vector, sources)
+            for (source, header, context, sources, vector) in records[start:start + batch_size]
+        ]
+
+
+def main():
+    paths = sys.argv[1:]
+    if not paths:
+        raise SystemExit("Kullanım: python bulk_import.py updated_format.json [diger.json ...]")
+
+    print("🔌 Milvus'a bağlanılıyor...")
+    connections.connect(alias="default", host=ingest.MILVUS_HOST, port=ingest.MILVUS_PORT)
+
+    collection = ingest.open_target_collection(build_index=False)
+
+    records = load_json_records(paths)
+    bulk_ingest(collection, iter_record_rows(records), total=len(records))
+    ingest.export_chunk_store(collection)
+    ingest.export_domain_profile(collection)
+    ingest.publish_collection(collection)
+    print("✅ Veri yükleme tamamlandı!")
+
+
+if __name__ == "__main__":
+    main()
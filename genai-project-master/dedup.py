@@ -0,0 +1,128 @@
+"""
+Ingest sırasında aynı / neredeyse aynı parçaların elenmesi (MinHash + LSH).
+
+Fakülte yönetmelikleri genel yönetmelikten uzun bölümler kopyalıyor; aynı metin birçok kez
+embed edilip index'e girince hem maliyet artıyor hem de top-k sonuçlarını aynı metin dolduruyor.
+Her kopya grubu için ilk görülen parça (canonical) tutulur, diğer kopyaların kaynakları ona eklenir.
+Kopyalar sadece aynı grup (kategori / partition key) içinde birleşir: canonical parçanın tek bir
+category değeri var, farklı fakültelerin kopyası birleşseydi diğer fakültelerin kapsamlı
+aramasında (scope) o metin hiç bulunamazdı.
+
+- Birebir aynı metin (boşluk/büyük-küçük harf normalize): SHA-1 ile.
+- Neredeyse aynı metin: kelime 3-gram shingle'larının MinHash imzası, LSH bantlarıyla aday bulma,
+  tahmini Jaccard benzerliği DEDUP_THRESHOLD üzerindeyse kopya.
+"""
+import os
+import re
+import random
+import hashlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+
+_PRIME = (1 << 61) - 1
+_WORD_RE = re.compile(r"\w+", re.U)
+
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall((text or "").replace("İ", "i").replace("I", "ı").lower()))
+
+
+def _hash64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class Deduplicator:
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM,
+                 bands: int = DEDUP_BANDS, shingle_size: int = 3):
+        if num_perm % bands:
+            raise ValueError("num_perm, bands'e tam bölünmeli")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = random.Random(1337)  # sabit tohum: aynı metin -> aynı imza
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+
+        self._exact: Dict[Tuple[str, str], int] = {}
+        self._buckets: Dict[Tuple[str, int, tuple], List[int]] = {}
+        self._signatures: List[tuple] = []
+
+    def _shingles(self, norm: str):
+        words = norm.split()
+        n = self.shingle_size
+        if len(words) <= n:
+            return {_hash64(norm)}
+        return {_hash64(" ".join(words[i:i + n])) for i in range(len(words) - n + 1)}
+
+    def signature(self, norm: str) -> tuple:
+        shingles = self._shingles(norm)
+        return tuple(min((a * x + b) % _PRIME for x in shingles) for a, b in self._perms)
+
+    @staticmethod
+    def similarity(sig_a: tuple, sig_b: tuple) -> float:
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+    def add(self, text: str, group: str = "") -> Optional[int]:
+        """Metni kaydeder. Aynı grupta kopyası varsa canonical parçanın sırasını, yoksa None döner."""
+        norm = normalize(text)
+        digest = (group, hashlib.sha1(norm.encode("utf-8")).hexdigest())
+        if digest in self._exact:
+            return self._exact[digest]
+
+        sig = self.signature(norm)
+        band_keys = [(group, b, sig[b * self.rows:(b + 1) * self.rows]) for b in range(self.bands)]
+
+        candidates = set()
+        for key in band_keys:
+            candidates.update(self._buckets.get(key, ()))
+        for idx in sorted(candidates):
+            if self.similarity(sig, self._signatures[idx]) >= self.threshold:
+                self._exact[digest] = idx
+                return idx
+
+        idx = len(self._signatures)
+        self._signatures.append(sig)
+        self._exact[digest] = idx
+        for key in band_keys:
+            self._buckets.setdefault(key, []).append(idx)
+        return None
+
+
+class StreamingDedup:
+    """
+    (source, header, context) akışını süzer, canonical parçaları hemen (source, header, context, sources)
+    olarak verir. Bir canonical'a sonradan kopya gelirse sources listesi büyür ve `grown` içine yazılır;
+    canonical zaten yazılmışsa ingest sonunda bu liste ile düzeltilir.
+    `group(source)` verilirse kopyalar sadece aynı grupta (ör. kategori) birleşir.
+    Bellek: benzersiz parça başına bir imza (~0.5 KB), metinler tutulmaz.
+    """
+
+    def __init__(self, deduplicator: Optional[Deduplicator] = None,
+                 group: Optional[Callable[[str], str]] = None):
+        self.dd = deduplicator or Deduplicator()
+        self.group = group
+        self.canonical: List[Tuple[str, List[str]]] = []  # sıra -> (header, sources)
+        self.grown: Dict[str, List[str]] = {}
+        self.kept = 0
+        self.dropped = 0
+
+    def __call__(self, records):
+        for source, header, context in records:
+            idx = self.dd.add(context, self.group(source) if self.group else "")
+            if idx is None:
+                sources = [source]
+                self.canonical.append((header, sources))
+                self.kept += 1
+                yield source, header, context, sources
+                continue
+
+            self.dropped += 1
+            canonical_header, sources = self.canonical[idx]
+            if source not in sources:
+                sources.append(source)
+                self.grown[canonical_header] = sources
@@ -1,21 +1,11 @@
-import os
-from dotenv import load_dotenv
-from pymilvus import connections, utility
+"""
+Koleksiyonu siler (eski kullanım). Aynısı: python manage.py drop --yes [koleksiyon]
 
-load_dotenv()
+Blue/green ingest'te aktif sürüm ve alias silinmez; bkz. manage.py.
+"""
+import sys
 
-MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
-MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
-COLLECTION_NAME = os.getenv("COLLECTION_NAME", "rules_qa")
+from manage import main
 
-connections.connect(
-    alias="default",
-    host=MILVUS_HOST,
-    port=MILVUS_PORT
-)
-
-if utility.has_collection(COLLECTION_NAME):
-    utility.drop_collection(COLLECTION_NAME)
-    print(f"✅ Collection silindi: {COLLECTION_NAME}")
-else:
-    print(f"ℹ️ Collection bulunamadı: {COLLECTION_NAME}")
+if __name__ == "__main__":
+    main(["drop", "--yes"] + sys.argv[1:])
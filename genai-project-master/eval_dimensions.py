@@ -0,0 +1,162 @@
+"""
+Kısaltılmış boyut / düşük hassasiyetli embedding'lerin geri çağırma (recall) kaybını ölçer.
+
+Referans: EMBED_MODEL'in tam boyutlu float32 vektörleriyle yapılan kesin (brute-force) arama.
+Her (boyut, hassasiyet) kombinasyonu için aynı sorguların top-k komşuları karşılaştırılır.
+
+text-embedding-3-* modellerinde `dimensions` parametresi, tam vektörün ilk N bileşenini
+alıp yeniden normalize etmekle aynı sonucu verir; bu yüzden korpus yalnızca bir kez
+(tam boyutta) embed edilir ve diğer boyutlar yerelde türetilir.
+
+Örnek:
+    python eval_dimensions.py --dims 1536 1024 512 256 --k 3 10
+    python eval_dimensions.py --questions sorular.txt --json format.json
+"""
+import os
+import json
+import argparse
+
+import numpy as np
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from ingest import DOCS_DIR, CHUNK_SIZE, CHUNK_OVERLAP, EMBED_MODEL, read_document, chunk_text
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
+
+
+def load_corpus(json_files):
+    texts = []
+    for file in sorted(os.listdir(DOCS_DIR)):
+        text = read_document(os.path.join(DOCS_DIR, file))
+        if text is None:
+            continue
+        texts.extend(chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP))
+
+    for path in json_files:
+        with open(path, "r", encoding="utf-8") as f:
+            texts.extend(item["context"] for item in json.load(f) if item.get("context"))
+    return texts
+
+
+def embed_all(client, texts, batch_size=128):
+    out = []
+    for i in range(0, len(texts), batch_size):
+        resp = client.embeddings.create(model=EMBED_MODEL, input=texts[i:i + batch_size])
+        out.extend(d.embedding for d in resp.data)
+    return np.asarray(out, dtype=np.float32)
+
+
+def load_or_embed(cache_path, client, corpus, questions):
+    if cache_path and os.path.exists(cache_path):
+        data = np.load(cache_path)
+        if data["corpus"].shape[0] == len(corpus) and data["questions"].shape[0] == len(questions):
+            print("📦 Embedding cache kullanılıyor:", cache_path)
+            return data["corpus"], data["questions"]
+
+    print(f"🔢 {len(corpus)} parça + {len(questions)} soru embed ediliyor ({EMBED_MODEL})...")
+    corpus_vecs = embed_all(client, corpus)
+    question_vecs = embed_all(client, questions) if questions else np.zeros((0, corpus_vecs.shape[1]), np.float32)
+    if cache_path:
+        np.savez(cache_path, corpus=corpus_vecs, questions=question_vecs)
+    return corpus_vecs, question_vecs
+
+
+def reduce(vecs, dim):
+    v = vecs[:, :dim]
+    norms = np.linalg.norm(v, axis=1, keepdims=True)
+    return v / np.maximum(norms, 1e-12)
+
+
+def quantize(vecs, precision):
+    if precision == "float32":
+        return vecs
+    if precision == "float16":
+        return vecs.astype(np.float16).astype(np.float32)
+    if precision == "sq8":
+        # IVF_SQ8 benzeri: boyut başına min/max ile 8-bit skaler quantize
+        lo, hi = vecs.min(axis=0), vecs.max(axis=0)
+        scale = np.maximum(hi - lo, 1e-12) / 255.0
+        codes = np.round((vecs - lo) / scale)
+        return (codes * scale + lo).astype(np.float32)
+    raise ValueError(precision)
+
+
+BYTES_PER_COMPONENT = {"float32": 4, "float16": 2, "sq8": 1}
+
+
+def topk(queries, corpus, k, exclude_self):
+    scores = queries @ corpus.T
+    if exclude_self:
+        np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall(ref, got):
+    k = ref.shape[1]
+    hits = sum(len(set(r) & set(g)) for r, g in zip(ref.tolist(), got.tolist()))
+    return hits / (len(ref) * k) if len(ref) else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Boyut/hassasiyet recall kaybı değerlendirmesi")
+    parser.add_argument("--dims", type=int, nargs="+", default=[1536, 1024, 768, 512, 256])
+    parser.add_argument("--precisions", nargs="+", default=["float32", "float16", "sq8"])
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 10])
+    parser.add_argument("--questions", help="her satırda bir soru; yoksa parçalar birbirine sorgu olur")
+    parser.add_argument("--json", nargs="*", default=[], help="format.json benzeri ek korpus dosyaları")
+    parser.add_argument("--cache", default="eval_embeddings.npz")
+    parser.add_argument("--out", help="sonuçları JSON olarak yaz")
+    args = parser.parse_args()
+
+    if not OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY bulunamadı. .env dosyanı kontrol et.")
+
+    corpus = load_corpus(args.json)
+    questions = []
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    corpus_full, question_full = load_or_embed(args.cache, OpenAI(api_key=OPENAI_API_KEY), corpus, questions)
+    full_dim = corpus_full.shape[1]
+
+    # sorgu yoksa: her parça diğer parçalar için sorgu (kendisi hariç)
+    exclude_self = not questions
+    query_full = question_full if questions else corpus_full
+
+    max_k = max(args.k)
+    reference = topk(query_full, corpus_full, max_k, exclude_self)
+
+    rows = []
+    for dim in sorted({d for d in args.dims if d <= full_dim}, reverse=True):
+        corpus_d = reduce(corpus_full, dim)
+        query_d = reduce(query_full, dim)
+        for precision in args.precisions:
+            got = topk(query_d, quantize(corpus_d, precision), max_k, exclude_self)
+            row = {
+                "dim": dim,
+                "precision": precision,
+                "bytes_per_vector": dim * BYTES_PER_COMPONENT[precision],
+                "memory_ratio": round(dim * BYTES_PER_COMPONENT[precision] / (full_dim * 4), 4),
+            }
+            for k in args.k:
+                row[f"recall@{k}"] = round(recall(reference[:, :k], got[:, :k]), 4)
+            rows.append(row)
+
+    print(f"\nReferans: {EMBED_MODEL} dim={full_dim} float32 | korpus={len(corpus)} | sorgu={len(query_full)}")
+    header = ["dim", "precision", "bytes_per_vector", "memory_ratio"] + [f"recall@{k}" for k in args.k]
+    print(" ".join(h.rjust(16) for h in header))
+    for row in rows:
+        print(" ".join(str(row[h]).rjust(16) for h in header))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"model": EMBED_MODEL, "full_dim": full_dim, "results": rows}, f, ensure_ascii=False, indent=2)
+        print("📝 Sonuçlar yazıldı:", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Etiketli soru setiyle retrieval değerlendirmesi ve TOP_K / MIN_SCORE kalibrasyonu.
+
+Sorular backend'in gerçek retrieval yolundan (backend.app.search_milvus) geçirilir:
+- alan içi sorular için recall@k ve MRR,
+- her MIN_SCORE eşiği için alakasız soru reddetme oranı ve alan içi soruların yanlışlıkla reddedilme oranı,
+- retrieval gecikmesi (embedding + Milvus arama).
+Önbellek kapalıdır (CACHE_BACKEND=none): gecikme gerçek aramayı ölçer ve SEARCH_PARAMS / index
+değişikliğinden sonra eski sonuçlar okunmaz.
+
+Soru seti formatı (eval/retrieval_questions.json):
+    {"question": "...", "relevant_sources": ["erasmus.docx"], "relevant_text": ["3 ilâ 12 ay"]}
+    {"question": "...", "off_topic": true}
+Bir sonuç; kaynağı relevant_sources içindeyse veya metni relevant_text ifadelerinden birini
+içeriyorsa ilgili sayılır.
+
+Örnek:
+    python eval_retrieval.py --k-max 10 --out eval_retrieval_report.json
+"""
+import os
+import json
+import time
+import argparse
+
+# backend import anında önbelleği kurar -> önce
+os.environ["CACHE_BACKEND"] = "none"
+
+from backend.app import search_milvus, TOP_K, MIN_SCORE
+
+
+def tr_lower(text: str) -> str:
+    return (text or "").replace("İ", "i").replace("I", "ı").lower()
+
+
+def is_relevant(hit, item) -> bool:
+    source = os.path.basename(hit.get("source") or "")
+    if source and source in item.get("relevant_sources", []):
+        return True
+    haystack = tr_lower(f"{hit.get('header') or ''} {hit.get('context') or ''}")
+    return any(tr_lower(t) in haystack for t in item.get("relevant_text", []))
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(p / 100 * (len(s) - 1)))))
+    return s[idx]
+
+
+def frange(start, stop, step):
+    out = []
+    v = start
+    while v <= stop + 1e-9:
+        out.append(round(v, 4))
+        v += step
+    return out
+
+
+def run(questions, k_max):
+    rows = []
+    for item in questions:
+        t0 = time.perf_counter()
+        hits = search_milvus(item["question"], top_k=k_max)
+        latency_ms = (time.perf_counter() - t0) * 1000
+
+        rank = None
+        if not item.get("off_topic"):
+            for i, hit in enumerate(hits, start=1):
+                if is_relevant(hit, item):
+                    rank = i
+                    break
+
+        rows.append({
+            "question": item["question"],
+            "off_topic": bool(item.get("off_topic")),
+            "best_score": float(hits[0]["score"]) if hits else 0.0,
+            "first_relevant_rank": rank,
+            "latency_ms": round(latency_ms, 2),
+        })
+    return rows
+
+
+def summarize(rows, k_max, thresholds, target_recall):
+    in_domain = [r for r in rows if not r["off_topic"]]
+    off_topic = [r for r in rows if r["off_topic"]]
+
+    recall_at = {}
+    for k in range(1, k_max + 1):
+        found = sum(1 for r in in_domain if r["first_relevant_rank"] and r["first_relevant_rank"] <= k)
+        recall_at[k] = round(found / len(in_domain), 4) if in_domain else 0.0
+
+    mrr = sum(1.0 / r["first_relevant_rank"] for r in in_domain if r["first_relevant_rank"])
+    mrr = round(mrr / len(in_domain), 4) if in_domain else 0.0
+
+    threshold_rows = []
+    for thr in thresholds:
+        rejected_off = sum(1 for r in off_topic if r["best_score"] < thr)
+        rejected_in = sum(1 for r in in_domain if r["best_score"] < thr)
+        off_rate = rejected_off / len(off_topic) if off_topic else 0.0
+        false_rate = rejected_in / len(in_domain) if in_domain else 0.0
+        threshold_rows.append({
+            "min_score": thr,
+            "off_topic_rejection": round(off_rate, 4),
+            "in_domain_false_rejection": round(false_rate, 4),
+            # dengeli doğruluk: iki sınıfın doğru karar oranlarının ortalaması
+            "balanced_accuracy": round((off_rate + (1 - false_rate)) / 2, 4),
+        })
+
+    # en küçük TOP_K: recall@k_max'ın target_recall kadarına ulaşan ilk k
+    best_recall = recall_at.get(k_max, 0.0)
+    suggested_top_k = next(
+        (k for k in range(1, k_max + 1) if recall_at[k] >= best_recall * target_recall), k_max
+    )
+    # en iyi MIN_SCORE: en yüksek dengeli doğruluk; eşitlikte daha düşük (daha az yanlış red) eşik
+    best_thr = max(threshold_rows, key=lambda t: (t["balanced_accuracy"], -t["min_score"])) if threshold_rows else None
+
+    latencies = [r["latency_ms"] for r in rows]
+    return {
+        "questions": {"in_domain": len(in_domain), "off_topic": len(off_topic)},
+        "recall_at_k": recall_at,
+        "mrr": mrr,
+        "thresholds": threshold_rows,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies, default=0.0),
+        },
+        "current": {"TOP_K": TOP_K, "MIN_SCORE": MIN_SCORE},
+        "suggested": {
+            "TOP_K": suggested_top_k,
+            "MIN_SCORE": best_thr["min_score"] if best_thr else MIN_SCORE,
+        },
+    }
+
+
+def print_report(report):
+    print(f"\nSorular: {report['questions']['in_domain']} alan içi, {report['questions']['off_topic']} alakasız")
+    print("recall@k: " + "  ".join(f"@{k}={v:.2f}" for k, v in report["recall_at_k"].items()))
+    print(f"MRR: {report['mrr']:.3f}")
+
+    print("\nmin_score  off_topic_red  yanlış_red  dengeli_doğ.")
+    for t in report["thresholds"]:
+        print(f"{t['min_score']:>9.3f}  {t['off_topic_rejection']:>13.2f}  "
+              f"{t['in_domain_false_rejection']:>10.2f}  {t['balanced_accuracy']:>12.3f}")
+
+    lat = report["latency_ms"]
+    print(f"\nRetrieval gecikmesi (ms): ort={lat['mean']} p50={lat['p50']} p95={lat['p95']} max={lat['max']}")
+
+    cur, sug = report["current"], report["suggested"]
+    print(f"\n✅ Öneri: TOP_K={sug['TOP_K']} (şu an {cur['TOP_K']}), "
+          f"MIN_SCORE={sug['MIN_SCORE']} (şu an {cur['MIN_SCORE']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval recall@k / MIN_SCORE kalibrasyonu")
+    parser.add_argument("--questions", default="eval/retrieval_questions.json")
+    parser.add_argument("--k-max", type=int, default=10)
+    parser.add_argument("--min-threshold", type=float, default=0.10)
+    parser.add_argument("--max-threshold", type=float, default=0.50)
+    parser.add_argument("--step", type=float, default=0.025)
+    parser.add_argument("--target-recall", type=float, default=0.95,
+                        help="önerilen TOP_K, recall@k_max'ın bu oranına ulaşan en küçük k")
+    parser.add_argument("--out", help="raporu JSON olarak yaz")
+    args = parser.parse_args()
+
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+
+    rows = run(questions, args.k_max)
+    report = summarize(
+        rows, args.k_max, frange(args.min_threshold, args.max_threshold, args.step), args.target_recall
+    )
+    report["rows"] = rows
+    print_report(report)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print("📝 Rapor yazıldı:", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,24 @@
 import os
 import re
+import json
+import time
+import fnmatch
+import zipfile
+import xml.etree.ElementTree as ET
 from tqdm import tqdm
 from dotenv import load_dotenv
 
 from pypdf import PdfReader
-import docx
 
-from openai import OpenAI
 from pymilvus import (
     connections, utility,
     FieldSchema, CollectionSchema, DataType, Collection
 )
 
+from backend import aliases
+from backend.embedders import get_embedder
+from dedup import Deduplicator, StreamingDedup
+
 load_dotenv()
 
 # -----------------------
@@ -21,16 +28,33 @@ DOCS_DIR = os.getenv("DOCS_DIR", "documents")
 
 MILVUS_HOST = os.getenv("MILVUS_HOST", "localhost")
 MILVUS_PORT = os.getenv("MILVUS_PORT", "19530")
-COLLECTION_NAME = os.getenv("MILVUS_COLLECTION", "rules_qa")
+COLLECTION_NAME = aliases.collection_setting()  # MILVUS_COLLECTION / COLLECTION_NAME (backend ile ortak)
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
 VECTOR_DIM = int(os.getenv("VECTOR_DIM", "1536"))
 
+# vektör hassasiyeti: float32 | float16 (float16 -> yarı bellek)
+VECTOR_PRECISION = os.getenv("VECTOR_PRECISION", "float32").lower()
+# index tipi: AUTOINDEX | HNSW | IVF_FLAT | IVF_SQ8 (skaler quantize) ...
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "AUTOINDEX").upper()
+VECTOR_INDEX_PARAMS = json.loads(os.getenv("VECTOR_INDEX_PARAMS", "{}"))
+
 # Eğer true yaparsan koleksiyon silinip sıfırdan yüklenir
+# (BLUE_GREEN'de: alias'lardan önceki aynı adlı koleksiyon, ilk geçişte silinip yerine alias kurulur)
 RESET_COLLECTION = os.getenv("RESET_COLLECTION", "false").lower() == "true"
 
+# BLUE_GREEN=true -> her ingest yeni bir <MILVUS_COLLECTION>_v<zaman> koleksiyonuna yazar, index'i kurup
+# yükler, sonra MILVUS_COLLECTION alias'ını atomik olarak ona çevirir (bkz. backend/aliases.py).
+# SWITCH_ALIAS=false -> sadece kurulur; geçiş backend'den POST /admin/index/switch ile yapılır.
+# Varsayılan kapalı (mevcut koleksiyona yazılır). Var olan kurulumu bir kerelik geçirmek için:
+#     python manage.py ingest --blue-green --reset
+# (eski aynı adlı koleksiyon yeni sürüm hazır olunca silinip yerine alias kurulur); sonraki
+# ingest'ler BLUE_GREEN=true (ya da --blue-green) ile çalıştırılmalı.
+BLUE_GREEN = os.getenv("BLUE_GREEN", "false").lower() == "true"
+SWITCH_ALIAS = os.getenv("SWITCH_ALIAS", "true").lower() == "true"
+
 # batch insert (hız)
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
 
@@ -38,42 +62,196 @@ BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "800"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "150"))
 
+# kategori (partition key): dosya adı deseni -> kategori eşlemesi (JSON)
+# eşleşme yoksa dosya adından türetilir (ör. "ders-kayit-rehberi.pdf" -> "ders-kayit-rehberi")
+CATEGORY_MAP_FILE = os.getenv("CATEGORY_MAP_FILE", "categories.json")
+NUM_PARTITIONS = int(os.getenv("NUM_PARTITIONS", "16"))
+
+# DEDUP=true -> aynı kategorideki aynı / neredeyse aynı parçalar bir kez embed edilir, kaynakları birleştirilir (bkz. dedup.py)
+DEDUP = os.getenv("DEDUP", "true").lower() == "true"
+SOURCES_MAX_LENGTH = 2048
+
+# BULK_IMPORT=true -> satırlar Parquet/NumPy dosyalarına yazılıp Milvus bulk insert ile yüklenir (bkz. bulk_import.py)
+BULK_IMPORT = os.getenv("BULK_IMPORT", "false").lower() == "true"
+
+# iki aşamalı retrieval için yerel parça deposu (backend CHUNK_STORE_PATH ile aynı yol)
+CHUNK_STORE_PATH = os.getenv("CHUNK_STORE_PATH", "").strip()
+
+# alakasız soruları embedding'den önce eleyen karakter n-gram profili (backend ile aynı yol, boş -> yazılmaz)
+DOMAIN_PROFILE_PATH = os.getenv("DOMAIN_PROFILE_PATH", "domain_profile.json").strip()
+
+# DRY_RUN=true -> OpenAI/Milvus çağrılmaz; sadece parse + chunk profili çıkarılır
+DRY_RUN = os.getenv("DRY_RUN", "false").lower() == "true"
+PROFILE_JSON = os.getenv("PROFILE_JSON", "ingest_profile.json")
+
+# embedding fiyatı (USD / 1M token) - text-embedding-3-small: 0.02
+EMBED_PRICE_PER_1M = float(os.getenv("EMBED_PRICE_PER_1M", "0.02"))
+
 # -----------------------
 # UTILS
 # -----------------------
+def vector_dtype():
+    if VECTOR_PRECISION == "float32":
+        return DataType.FLOAT_VECTOR
+    if VECTOR_PRECISION == "float16":
+        return DataType.FLOAT16_VECTOR
+    raise RuntimeError(f"VECTOR_PRECISION='{VECTOR_PRECISION}' desteklenmiyor (float32 | float16).")
+
+def to_vector(emb):
+    if VECTOR_PRECISION == "float16":
+        import numpy as np
+        return np.asarray(emb, dtype=np.float16)
+    return emb
+
 def clean_text(text: str) -> str:
     text = text.replace("\x00", " ")
     text = re.sub(r"\s+", " ", text)
     return text.strip()
 
 def chunk_text(text: str, size=800, overlap=150):
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + size
-        chunk = text[start:end].strip()
+    return list(iter_chunks([text], size=size, overlap=overlap))
+
+def iter_chunks(pieces, size=800, overlap=150):
+    """
+    Temizlenmiş metin parçalarını (sayfa / paragraf) " " ile birleşmiş tek metin gibi chunk'lar,
+    ama sadece son chunk + gelen parça kadar metni bellekte tutar; sayfa sınırlarını aşan chunk'lar
+    tek metin üzerinde chunk_text ile birebir aynıdır.
+    """
+    if overlap >= size:
+        raise ValueError("CHUNK_OVERLAP, CHUNK_SIZE'dan küçük olmalı")
+    buf = ""
+    started = False
+    for piece in pieces:
+        if not piece:
+            continue
+        buf = f"{buf} {piece}" if started else piece
+        started = True
+        while len(buf) >= size:
+            chunk = buf[:size].strip()
+            if chunk:
+                yield chunk
+            buf = buf[size - overlap:]
+    while buf:
+        chunk = buf[:size].strip()
         if chunk:
-            chunks.append(chunk)
-        start = end - overlap
-        if start < 0:
-            start = 0
-    return chunks
+            yield chunk
+        buf = buf[size - overlap:]
 
-def read_pdf(path: str) -> str:
+def iter_pdf_pages(path: str):
     reader = PdfReader(path)
-    return clean_text(" ".join((p.extract_text() or "") for p in reader.pages))
+    for page in reader.pages:
+        text = clean_text(page.extract_text() or "")
+        if text:
+            yield text
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def iter_docx_paragraphs(path: str):
+    """
+    word/document.xml'i iterparse ile gezer; python-docx'in Document.paragraphs'ı gibi sadece
+    gövdedeki (body) paragrafları verir ama tüm DOM'u belleğe almaz.
+    """
+    with zipfile.ZipFile(path) as z, z.open("word/document.xml") as f:
+        depth = 0
+        for event, el in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                continue
+            # document(1) > body(2) > p(3)
+            if depth == 3:
+                if el.tag == W_NS + "p":
+                    parts = []
+                    for node in el.iter():
+                        if node.tag == W_NS + "t":
+                            parts.append(node.text or "")
+                        elif node.tag == W_NS + "tab":
+                            parts.append("\t")
+                        elif node.tag in (W_NS + "br", W_NS + "cr"):
+                            parts.append("\n")
+                    text = clean_text("".join(parts))
+                    if text:
+                        yield text
+                el.clear()
+            depth -= 1
+
+def iter_document_pieces(path: str):
+    """Desteklenen dosyanın temizlenmiş sayfa/paragraf akışı; desteklenmeyen uzantıda None döner."""
+    if path.lower().endswith(".pdf"):
+        return iter_pdf_pages(path)
+    if path.lower().endswith(".docx"):
+        return iter_docx_paragraphs(path)
+    return None
+
+def read_pdf(path: str) -> str:
+    return " ".join(iter_pdf_pages(path))
 
 def read_docx(path: str) -> str:
-    d = docx.Document(path)
-    return clean_text(" ".join(p.text for p in d.paragraphs))
+    return " ".join(iter_docx_paragraphs(path))
+
+def load_category_map():
+    if os.path.exists(CATEGORY_MAP_FILE):
+        with open(CATEGORY_MAP_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+CATEGORY_MAP = load_category_map()
+
+TR_ASCII = str.maketrans("çğıöşüÇĞİÖŞÜâîû", "cgiosuCGIOSUaiu")
 
-def ensure_collection():
-    if RESET_COLLECTION and utility.has_collection(COLLECTION_NAME):
-        print("🧹 RESET_COLLECTION=true -> koleksiyon siliniyor:", COLLECTION_NAME)
-        utility.drop_collection(COLLECTION_NAME)
+def slugify(text: str) -> str:
+    text = text.translate(TR_ASCII).lower()
+    return re.sub(r"[^a-z0-9]+", "-", text).strip("-")[:64] or "genel"
 
-    if not utility.has_collection(COLLECTION_NAME):
-        print("📦 Yeni koleksiyon oluşturuluyor:", COLLECTION_NAME)
+def derive_category(source: str) -> str:
+    """Kaynak dosya adından arama kapsamı (fakülte / doküman grubu) türetir."""
+    name = os.path.basename(source)
+    for pattern, category in CATEGORY_MAP.items():
+        if fnmatch.fnmatch(name.lower(), pattern.lower()):
+            return slugify(category)
+    return slugify(os.path.splitext(name)[0])
+
+def read_document(path: str):
+    """Desteklenen dosyayı tek metin olarak okur; desteklenmeyen uzantıda None döner."""
+    pieces = iter_document_pieces(path)
+    return None if pieces is None else " ".join(pieces)
+
+def make_token_counter():
+    """tiktoken varsa gerçek token sayısı, yoksa ~4 karakter/token tahmini."""
+    try:
+        import tiktoken
+        try:
+            enc = tiktoken.encoding_for_model(EMBED_MODEL)
+        except KeyError:
+            enc = tiktoken.get_encoding("cl100k_base")
+        return (lambda t: len(enc.encode(t))), True
+    except ImportError:
+        return (lambda t: max(1, len(t) // 4) if t else 0), False
+
+def check_vector_field(collection):
+    """Mevcut koleksiyonun vektör alanı VECTOR_DIM / VECTOR_PRECISION ile uyumlu mu?"""
+    field = next(f for f in collection.schema.fields if f.name == "vector_context")
+    dim = int(field.params.get("dim", 0))
+    if field.dtype != vector_dtype() or dim != VECTOR_DIM:
+        raise RuntimeError(
+            f"Koleksiyon vektör alanı ({field.dtype.name}, dim={dim}) ile ayarlar "
+            f"({VECTOR_PRECISION}, dim={VECTOR_DIM}) uyuşmuyor. RESET_COLLECTION=true ile yeniden yükle."
+        )
+
+def create_vector_index(collection):
+    collection.create_index(
+        field_name="vector_context",
+        index_params={"metric_type": "IP", "index_type": VECTOR_INDEX, "params": VECTOR_INDEX_PARAMS}
+    )
+    print(f"✅ Index oluşturuldu: {VECTOR_INDEX} ({VECTOR_PRECISION}, dim={VECTOR_DIM})")
+
+def ensure_collection(name=COLLECTION_NAME, build_index=True):
+    """build_index=False: yeni koleksiyonda index veri yüklendikten sonra (bulk import) kurulur."""
+    if RESET_COLLECTION and utility.has_collection(name):
+        print("🧹 RESET_COLLECTION=true -> koleksiyon siliniyor:", name)
+        utility.drop_collection(name)
+
+    if not utility.has_collection(name):
+        print("📦 Yeni koleksiyon oluşturuluyor:", name)
 
         fields = [
             FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
@@ -84,81 +262,339 @@ def ensure_collection():
             # Chunk başlığı / etiketi (dosya + chunk no)
             FieldSchema(name="header", dtype=DataType.VARCHAR, max_length=512),
 
+            # Parçanın geçtiği tüm kaynaklar (JSON liste) - dedup ile birleşen kopyalar
+            FieldSchema(name="sources", dtype=DataType.VARCHAR, max_length=SOURCES_MAX_LENGTH),
+
+            # Arama kapsamı (fakülte / doküman grubu) - partition key: filtreli arama sadece ilgili bölümü tarar
+            FieldSchema(name="category", dtype=DataType.VARCHAR, max_length=64, is_partition_key=True),
+
             # Metin parçası
             FieldSchema(name="context", dtype=DataType.VARCHAR, max_length=65535),
 
             # Embedding alanı (test.py ile uyumlu)
-            FieldSchema(name="vector_context", dtype=DataType.FLOAT_VECTOR, dim=VECTOR_DIM),
+            FieldSchema(name="vector_context", dtype=vector_dtype(), dim=VECTOR_DIM),
         ]
 
         schema = CollectionSchema(fields, "Selçuk Üniversitesi Yönetmelikleri - RAG")
-        collection = Collection(COLLECTION_NAME, schema)
+        collection = Collection(name, schema, num_partitions=NUM_PARTITIONS)
 
-        collection.create_index(
-            field_name="vector_context",
-            index_params={"metric_type": "IP", "index_type": "AUTOINDEX", "params": {}}
-        )
-        print("✅ Index oluşturuldu.")
+        if not build_index:
+            return collection
+        create_vector_index(collection)
     else:
-        collection = Collection(COLLECTION_NAME)
+        collection = Collection(name)
+        check_vector_field(collection)
+        if "category" not in {f.name for f in collection.schema.fields}:
+            print("⚠️ Koleksiyonda 'category' alanı yok; kapsamlı arama için RESET_COLLECTION=true ile yeniden yükle.")
 
     collection.load()
     return collection
 
-# -----------------------
-# MAIN
-# -----------------------
-def main():
-    if not OPENAI_API_KEY:
-        raise RuntimeError("OPENAI_API_KEY bulunamadı. .env dosyanı kontrol et.")
+def open_target_collection(build_index=True):
+    """BLUE_GREEN: her seferinde yeni sürüm koleksiyonu; değilse MILVUS_COLLECTION'ın kendisi."""
+    if not BLUE_GREEN:
+        return ensure_collection(COLLECTION_NAME, build_index)
 
-    print("🔌 Milvus'a bağlanılıyor...")
-    connections.connect(alias="default", host=MILVUS_HOST, port=MILVUS_PORT)
+    # embedding maliyeti harcanmadan önce: alias'a geçiş mümkün mü?
+    if SWITCH_ALIAS and not RESET_COLLECTION and aliases.is_legacy(COLLECTION_NAME):
+        raise RuntimeError(
+            f"'{COLLECTION_NAME}' alias değil, gerçek bir koleksiyon. Blue/green'e bir kerelik geçiş için "
+            "RESET_COLLECTION=true ile çalıştır ya da BLUE_GREEN=false kullan."
+        )
+    return ensure_collection(aliases.new_version_name(COLLECTION_NAME), build_index)
+
+def publish_collection(collection):
+    """BLUE_GREEN: alias'ı yeni sürüme çevirir ve eski sürümleri (INDEX_KEEP_VERSIONS) temizler."""
+    if not BLUE_GREEN:
+        return
+    if not SWITCH_ALIAS:
+        print(f"ℹ️ Yeni sürüm hazır: {collection.name} (geçiş için POST /admin/index/switch)")
+        return
+
+    aliases.switch_alias(COLLECTION_NAME, collection.name, drop_legacy=RESET_COLLECTION)
+    from backend.chunk_store import remove_chunk_store, version_path
+    for name in aliases.prune_versions(COLLECTION_NAME):
+        print("🧹 Eski sürüm silindi:", name)
+        if CHUNK_STORE_PATH:
+            remove_chunk_store(version_path(CHUNK_STORE_PATH, name))
+        if DOMAIN_PROFILE_PATH and os.path.exists(version_path(DOMAIN_PROFILE_PATH, name)):
+            os.remove(version_path(DOMAIN_PROFILE_PATH, name))
+
+def abort_empty_ingest(collection, build_index=None):
+    """
+    Yüklenecek satır yoksa devam edilmez (parça deposu, profil, alias geçişi boş koleksiyonla
+    yapılmasın). BLUE_GREEN'in yayınlanmamış boş sürümü silinir; yerinde yüklemede koleksiyon
+    index'siz / yüklenmemiş kalmasın diye `build_index(collection)` çağrılır.
+    """
+    if BLUE_GREEN and collection.name != COLLECTION_NAME:
+        utility.drop_collection(collection.name)
+        print("🧹 Boş sürüm silindi:", collection.name)
+    elif build_index is not None:
+        build_index(collection)
+    raise SystemExit("❌ Yüklenecek parça yok (DOCS_DIR / girdi dosyaları boş mu?); ingest durduruldu, alias değiştirilmedi.")
+
+def iter_records():
+    """DOCS_DIR'deki dosyaları sayfa/paragraf akışıyla okur ve chunk'ları hemen verir -> (source, header, context)"""
+    for file in sorted(os.listdir(DOCS_DIR)):
+        pieces = iter_document_pieces(os.path.join(DOCS_DIR, file))
+        if pieces is None:
+            continue
 
-    collection = ensure_collection()
+        for i, ch in enumerate(iter_chunks(pieces, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP), start=1):
+            yield file, f"{file} - Parça {i}", ch
+
+def encode_sources(sources):
+    # VARCHAR sınırını aşmayacak kadar kaynak tut
+    kept = list(sources)
+    while len(kept) > 1 and len(json.dumps(kept, ensure_ascii=False).encode("utf-8")) > SOURCES_MAX_LENGTH:
+        kept.pop()
+    return json.dumps(kept, ensure_ascii=False)
+
+def make_row(source, header, context, vector, sources=None):
+    return {
+        "source": source,
+        "sources": encode_sources(sources or [source]),
+        "header": header,
+        "category": derive_category(source),
+        "context": context,
+        "vector_context": to_vector(vector),
+    }
+
+def iter_batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_embedded_rows(records, embedder):
+    """BATCH_SIZE'lık gruplar halinde embed eder (batch başına tek liste çağrısı) ve satır listesi verir."""
+    for batch in iter_batches(records, BATCH_SIZE):
+        vectors = embedder.embed([chunk for (_, _, chunk, _) in batch])
+        yield [
+            make_row(source, header, chunk, v, sources)
+            for (source, header, chunk, sources), v in zip(batch, vectors)
+        ]
+
+def stored_vector(value):
+    # query float16 vektörleri bytes olarak döner
+    if VECTOR_PRECISION == "float16" and not hasattr(value, "dtype"):
+        import numpy as np
+        raw = value[0] if isinstance(value, list) else value
+        return np.frombuffer(raw, dtype=np.float16)
+    return value
+
+def apply_late_sources(collection, grown):
+    """Yazıldıktan sonra kopyası gelen canonical parçaların sources alanını günceller."""
+    fields = [f.name for f in collection.schema.fields if not f.auto_id]
+    if not grown or "sources" not in fields:
+        return 0
+
+    fixed = 0
+    for header, sources in grown.items():
+        encoded = encode_sources(sources)
+        rows = collection.query(
+            expr=f"header == {json.dumps(header, ensure_ascii=False)}",
+            output_fields=["id"] + fields,
+        )
+        stale = [r for r in rows if r.get("sources") != encoded]
+        if not stale:
+            continue
+        # auto_id koleksiyonda upsert id'yi koruyamaz -> önce yeni satırı ekle, sonra eskisini sil
+        # (vektör tekrar embed edilmez). Sıra önemli: BLUE_GREEN=false ile canlı koleksiyona
+        # yazarken parça aramadan hiç kaybolmaz, en kötü ihtimalle kısa süre iki kopya görünür.
+        # BLUE_GREEN'de bu adım yeni sürüm yayınlanmadan (alias çevrilmeden) çalışır.
+        collection.insert([
+            dict({f: r[f] for f in fields}, sources=encoded, vector_context=stored_vector(r["vector_context"]))
+            for r in stale
+        ])
+        collection.delete(expr=f"id in {[r['id'] for r in stale]}")
+        fixed += len(stale)
+
+    if fixed:
+        collection.flush()
+    return fixed
+
+def export_chunk_store(collection):
+    if CHUNK_STORE_PATH:
+        from backend.chunk_store import export_collection, version_path
+        # blue/green: her sürümün kendi deposu (backend aktif koleksiyonunkini açar)
+        path = version_path(CHUNK_STORE_PATH, collection.name) if BLUE_GREEN else CHUNK_STORE_PATH
+        export_collection(collection, path)
+
+def export_domain_profile(collection):
+    if DOMAIN_PROFILE_PATH:
+        from backend.chunk_store import version_path
+        from backend.prefilter import export_profile
+        # backend'in embedding'den önceki konu filtresi (bkz. backend/prefilter.py)
+        path = version_path(DOMAIN_PROFILE_PATH, collection.name) if BLUE_GREEN else DOMAIN_PROFILE_PATH
+        export_profile(collection, path)
 
-    client = OpenAI(api_key=OPENAI_API_KEY)
+# -----------------------
+# DRY RUN / PROFILE
+# -----------------------
+def profile_documents():
+    """Dosyaları parse + chunk eder, OpenAI/Milvus'a dokunmadan maliyet raporu döner."""
+    count_tokens, exact = make_token_counter()
+    files = []
+    dd = Deduplicator()
 
-    # 1) Dosyaları oku ve chunk'la
-    records = []  # (source, header, context)
-    for file in os.listdir(DOCS_DIR):
+    for file in sorted(os.listdir(DOCS_DIR)):
         path = os.path.join(DOCS_DIR, file)
 
-        if file.lower().endswith(".pdf"):
-            text = read_pdf(path)
-        elif file.lower().endswith(".docx"):
-            text = read_docx(path)
-        else:
+        t0 = time.perf_counter()
+        text = read_document(path)
+        parse_s = time.perf_counter() - t0
+        if text is None:
             continue
 
         chunks = chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
-        for i, ch in enumerate(chunks, start=1):
-            header = f"{file} - Parça {i}"
-            records.append((file, header, ch))
+        text_tokens = count_tokens(text)
+        chunk_tokens = sum(count_tokens(ch) for ch in chunks)
+        chunk_chars = sum(len(ch) for ch in chunks)
+        category = derive_category(file)
+        duplicates = [ch for ch in chunks if dd.add(ch, category) is not None]
+
+        files.append({
+            "file": file,
+            "category": category,
+            "parse_s": round(parse_s, 4),
+            "chars": len(text),
+            "chunks": len(chunks),
+            "text_tokens": text_tokens,
+            "embed_tokens": chunk_tokens,
+            # CHUNK_OVERLAP yüzünden iki kez embed edilen kısım
+            "overlap_chars": max(0, chunk_chars - len(text)),
+            "overlap_tokens": max(0, chunk_tokens - text_tokens),
+            "est_cost_usd": chunk_tokens * EMBED_PRICE_PER_1M / 1_000_000,
+            "max_chunk_tokens": max((count_tokens(ch) for ch in chunks), default=0),
+            # DEDUP=true olsaydı embed edilmeyecek parçalar (aynı kategorideki önceki dosyaların kopyaları dahil)
+            "duplicate_chunks": len(duplicates),
+            "duplicate_tokens": sum(count_tokens(ch) for ch in duplicates),
+        })
+
+    total_embed = sum(f["embed_tokens"] for f in files)
+    total_overlap = sum(f["overlap_tokens"] for f in files)
+    return {
+        "config": {
+            "docs_dir": DOCS_DIR,
+            "embed_model": EMBED_MODEL,
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "price_per_1m_tokens": EMBED_PRICE_PER_1M,
+            "exact_tokens": exact,
+        },
+        "files": files,
+        "totals": {
+            "files": len(files),
+            "parse_s": round(sum(f["parse_s"] for f in files), 4),
+            "chars": sum(f["chars"] for f in files),
+            "chunks": sum(f["chunks"] for f in files),
+            "embed_tokens": total_embed,
+            "overlap_tokens": total_overlap,
+            "overlap_ratio": round(total_overlap / total_embed, 4) if total_embed else 0.0,
+            "duplicate_chunks": sum(f["duplicate_chunks"] for f in files),
+            "duplicate_tokens": sum(f["duplicate_tokens"] for f in files),
+            "est_cost_usd": total_embed * EMBED_PRICE_PER_1M / 1_000_000,
+            "est_cost_dedup_usd": (total_embed - sum(f["duplicate_tokens"] for f in files)) * EMBED_PRICE_PER_1M / 1_000_000,
+        },
+    }
+
+def print_profile(report):
+    cols = [
+        ("file", 40), ("parse_s", 9), ("chars", 10), ("chunks", 8),
+        ("embed_tokens", 13), ("overlap_tokens", 15), ("duplicate_chunks", 17), ("est_cost_usd", 13),
+    ]
+    print(" ".join(name.ljust(w) if name == "file" else name.rjust(w) for name, w in cols))
+    for row in report["files"] + [dict(report["totals"], file="TOPLAM")]:
+        cells = []
+        for name, w in cols:
+            v = row.get(name, "")
+            if name == "file":
+                cells.append(str(v)[:w].ljust(w))
+            elif name == "est_cost_usd":
+                cells.append(f"{v:.5f}".rjust(w))
+            else:
+                cells.append(str(v).rjust(w))
+        print(" ".join(cells))
+
+    if not report["config"]["exact_tokens"]:
+        print("ℹ️ tiktoken kurulu değil; token sayıları ~4 karakter/token tahminidir.")
+
+def dry_run():
+    print("🧪 DRY_RUN=true -> OpenAI ve Milvus çağrılmayacak")
+    report = profile_documents()
+    print_profile(report)
+
+    with open(PROFILE_JSON, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("📝 Profil JSON yazıldı:", PROFILE_JSON)
+    return report
 
-    print(f"📄 Toplam {len(records)} parça oluşturuldu")
+# -----------------------
+# MAIN
+# -----------------------
+def main():
+    if DRY_RUN:
+        dry_run()
+        return
 
-    # 2) Embed + batch insert
-    sources_batch, headers_batch, contexts_batch, vectors_batch = [], [], [], []
+    uses_openai = not (EMBED_MODEL == "hash" or EMBED_MODEL.startswith(("hash:", "local:")))
+    if uses_openai and not OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY bulunamadı. .env dosyanı kontrol et.")
+
+    # toplu iş ayarları: uzun zaman aşımı + çok deneme (backend/transport.py, "ingest");
+    # import burada: transport ayarları import anında okunur, load_dotenv()'den sonra olmalı
+    from backend.transport import openai_client
+    client = openai_client("ingest") if uses_openai else None
+    embedder = get_embedder(EMBED_MODEL, VECTOR_DIM, client=client)
 
-    for (source, header, chunk) in tqdm(records, desc="Embedding + Insert"):
-        emb = client.embeddings.create(model=EMBED_MODEL, input=chunk).data[0].embedding
+    print("🔌 Milvus'a bağlanılıyor...")
+    connections.connect(alias="default", host=MILVUS_HOST, port=MILVUS_PORT)
 
-        sources_batch.append(source)
-        headers_batch.append(header)
-        contexts_batch.append(chunk)
-        vectors_batch.append(emb)
+    collection = open_target_collection(build_index=not BULK_IMPORT)
+    field_names = {f.name for f in collection.schema.fields}
 
-        if len(sources_batch) >= BATCH_SIZE:
-            collection.insert([sources_batch, headers_batch, contexts_batch, vectors_batch])
-            sources_batch, headers_batch, contexts_batch, vectors_batch = [], [], [], []
+    # 1) Dosyaları sayfa/paragraf akışıyla oku, chunk'la, (DEDUP) kopyaları ele - hepsi generator:
+    #    bellekte sadece o anki batch tutulur, doküman/korpus boyutundan bağımsız
+    # kopyalar sadece aynı kategoride birleşir (canonical satırın tek category'si var -> scope filtresi)
+    dedup = StreamingDedup(group=derive_category) if DEDUP else None
+    records = iter_records()
+    records = dedup(records) if dedup else ((s, h, c, [s]) for (s, h, c) in records)
+    rows = iter_embedded_rows(records, embedder)
 
-    # kalanlar
-    if sources_batch:
-        collection.insert([sources_batch, headers_batch, contexts_batch, vectors_batch])
+    # 2a) Bulk import: Parquet/NumPy dosyaları -> sunucu tarafı import -> index en sonda
+    if BULK_IMPORT:
+        from bulk_import import bulk_ingest
+        bulk_ingest(collection, rows)
 
-    collection.flush()
-    collection.load()
+    # 2b) Embed (liste girdisiyle, batch başına tek çağrı) + batch insert
+    else:
+        inserted = 0
+        with tqdm(desc=f"Embedding ({embedder.name}) + Insert", unit=" parça") as bar:
+            for batch in rows:
+                # eski şemalarda olmayan alanlar (ör. category) atlanır
+                collection.insert([{k: v for k, v in r.items() if k in field_names} for r in batch])
+                inserted += len(batch)
+                bar.update(len(batch))
+        if not inserted:
+            abort_empty_ingest(collection)
+
+        collection.flush()
+        collection.load()
+
+    if dedup:
+        print(f"🧬 Dedup: {dedup.dropped} kopya parça elendi, {dedup.kept} benzersiz parça yüklendi")
+        fixed = apply_late_sources(collection, dedup.grown)
+        if fixed:
+            print(f"   {fixed} parçanın kaynak listesi güncellendi")
+
+    export_chunk_store(collection)
+    export_domain_profile(collection)
+    publish_collection(collection)
 
     # küçük bilgi
     try:
@@ -0,0 +1,166 @@
+"""
+OpenAI uyumlu sahte sunucu (yük testleri için).
+
+/v1/embeddings ve /v1/chat/completions uçlarını, log-normal dağılımlı gecikmelerle taklit eder.
+Backend'i buna yönlendirmek için: OPENAI_BASE_URL=http://127.0.0.1:8799/v1
+
+Gecikmeler "median_ms,sigma" biçiminde ayarlanır:
+    FAKE_EMBED_LATENCY_MS=150,0.35
+    FAKE_CHAT_LATENCY_MS=1800,0.5
+
+Zaman aşımı testi için isteklerin bir kısmı takılabilir (cevap FAKE_HANG_SECONDS sonra gelir):
+    FAKE_HANG_RATE=0.1 FAKE_HANG_SECONDS=300
+
+logprobs=true isteklerinde token başına ~FAKE_LOGPROB döner (model kademesi testi; -1 -> düşük güven):
+    FAKE_LOGPROB=-0.15
+
+Çalıştırma:
+    uvicorn loadtest.fake_openai:app --port 8799
+"""
+import os
+import math
+import time
+import random
+import base64
+import asyncio
+import json
+import zlib
+from array import array
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+EMBED_LATENCY = os.getenv("FAKE_EMBED_LATENCY_MS", "150,0.35")
+CHAT_LATENCY = os.getenv("FAKE_CHAT_LATENCY_MS", "1800,0.5")
+FAKE_DIM = int(os.getenv("FAKE_EMBED_DIM", "1536"))
+# logprobs istenirse (model kademesi) her token için verilen ortalama logprob
+FAKE_LOGPROB = float(os.getenv("FAKE_LOGPROB", "-0.15"))
+HANG_RATE = float(os.getenv("FAKE_HANG_RATE", "0"))
+HANG_SECONDS = float(os.getenv("FAKE_HANG_SECONDS", "300"))
+
+FAKE_ANSWER = (
+    "Ders kaydı, akademik takvimde ilan edilen kayıt yenileme tarihlerinde öğrenci otomasyonu "
+    "üzerinden yapılır. Danışman onayı sonrasında kayıt kesinleşir."
+)
+
+app = FastAPI(title="Fake OpenAI")
+
+
+def sample_seconds(spec: str) -> float:
+    median, sigma = (float(x) for x in spec.split(","))
+    return median * math.exp(random.gauss(0.0, sigma)) / 1000.0
+
+
+async def sleep_lognormal(spec: str):
+    await asyncio.sleep(sample_seconds(spec))
+
+
+async def maybe_hang():
+    if HANG_RATE and random.random() < HANG_RATE:
+        await asyncio.sleep(HANG_SECONDS)
+
+
+def fake_vector(text: str, dim: int):
+    # metinden deterministik birim vektör
+    rng = random.Random(zlib.crc32(text.encode("utf-8")))
+    vec = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+def approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "fake", "object": "model", "created": 0, "owned_by": "fake"}]}
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body.get("input")
+    if isinstance(inputs, str):
+        inputs = [inputs]
+
+    await maybe_hang()
+    await sleep_lognormal(EMBED_LATENCY)
+
+    dim = int(body.get("dimensions") or FAKE_DIM)
+    data = []
+    for i, text in enumerate(inputs):
+        vec = fake_vector(str(text), dim)
+        if body.get("encoding_format") == "base64":
+            emb = base64.b64encode(array("f", vec).tobytes()).decode("ascii")
+        else:
+            emb = vec
+        data.append({"object": "embedding", "index": i, "embedding": emb})
+
+    tokens = sum(approx_tokens(str(t)) for t in inputs)
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "fake"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+def usage(body):
+    messages = body.get("messages", [])
+    prompt_tokens = sum(approx_tokens(m.get("content") or "") for m in messages)
+    completion_tokens = approx_tokens(FAKE_ANSWER)
+    # sağlayıcı gibi: sabit önek (sistem + geçmiş, yani son mesaj hariç) >=1024 token ise
+    # 128'lik adımlarla önbellekten sayılır
+    prefix = sum(approx_tokens(m.get("content") or "") for m in messages[:-1])
+    cached = (prefix // 128) * 128 if prefix >= 1024 else 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached},
+    }
+
+
+async def stream_chunks(body, total_s: float):
+    # ilk token'a kadar sürenin ~%30'u, kalanı kelime kelime
+    words = FAKE_ANSWER.split(" ")
+    await asyncio.sleep(total_s * 0.3)
+    base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": body.get("model", "fake")}
+    for i, word in enumerate(words):
+        delta = {"content": word if i == 0 else " " + word}
+        if i == 0:
+            delta["role"] = "assistant"
+        choice = {"index": 0, "delta": delta, "finish_reason": None}
+        if body.get("logprobs"):
+            logprob = min(0.0, random.gauss(FAKE_LOGPROB, abs(FAKE_LOGPROB) / 2))
+            choice["logprobs"] = {"content": [{"token": delta["content"], "logprob": logprob, "bytes": None, "top_logprobs": []}]}
+        yield "data: " + json.dumps(dict(base, choices=[choice])) + "\n\n"
+        await asyncio.sleep(total_s * 0.7 / len(words))
+    yield "data: " + json.dumps(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])) + "\n\n"
+    if (body.get("stream_options") or {}).get("include_usage"):
+        yield "data: " + json.dumps(dict(base, choices=[], usage=usage(body))) + "\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await maybe_hang()
+    if body.get("stream"):
+        return StreamingResponse(stream_chunks(body, sample_seconds(CHAT_LATENCY)), media_type="text/event-stream")
+
+    await sleep_lognormal(CHAT_LATENCY)
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": FAKE_ANSWER},
+            "finish_reason": "stop",
+        }],
+        "usage": usage(body),
+    }
@@ -0,0 +1,284 @@
+"""
+Kaydedilmiş /chat trafiğini yeniden oynatma ve iki kaydı karşılaştırma.
+
+Kayıt: backend RECORD_PATH ile çalışırken yazılan JSONL (bkz. backend/recorder.py).
+
+run  -> kayıttaki istekleri orijinal aralıklarla (ya da --speed kat hızlı) yeni sürüme gönderir.
+        Varsayılan olarak sahte OpenAI + MILVUS_FAKE ile yerel bir backend başlatır; --real ile
+        .env'deki gerçek OpenAI/Milvus kullanılır. Yerel backend RECORD_PATH=--out ile başlatılır,
+        her istek X-Request-Id (kayıttaki satır no) taşır -> yeni kayıt eskisiyle eşleştirilebilir.
+        --url ile çalışan bir servise oynatılırsa --out'a istemci tarafı süreler yazılır (id yok);
+        sunucu tarafı için o servisin kendi RECORD_PATH dosyası kullanılır.
+diff -> iki kaydı eşleştirir: toplam ve aşama bazında gecikme yüzdelikleri, getirilen parça
+        id'lerindeki değişim, durum (ok/error/...) değişimleri.
+
+Örnek:
+    RECORD_PATH=traffic.jsonl RECORD_SAMPLE_RATE=0.1 uvicorn backend.app:app      # üretimde kayıt
+    python -m loadtest.replay run traffic.jsonl --out new.jsonl --speed 4
+    python -m loadtest.replay diff traffic.jsonl new.jsonl
+    python -m loadtest.replay diff base.jsonl new.jsonl --max-regression 20 --min-overlap 0.95   # CI
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import httpx
+
+from loadtest.run import percentile, start_process, stop_process, wait_ready
+
+STAGES = ["prefilter", "embed", "search", "fetch", "llm"]
+
+
+def load_records(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def record_key(record, index):
+    # orijinal kayıtta rid yoksa satır no; yeniden oynatılan kayıtta rid = orijinal satır no
+    return str(record["rid"]) if record.get("rid") not in (None, "") else str(index)
+
+
+def fake_history(n):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": "..."} for i in range(n)]
+
+
+# -----------------------
+# RUN
+# -----------------------
+async def replay(base_url, records, speed, concurrency, timeout):
+    results = [None] * len(records)
+    sem = asyncio.Semaphore(concurrency)
+    ts0 = min((r.get("ts", 0.0) for r in records), default=0.0)
+    lags = []
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+
+        async def send(i, record):
+            body = {"message": record.get("message", ""), "history": fake_history(record.get("history", 0))}
+            if record.get("scope"):
+                body["scope"] = record["scope"]
+            t0 = time.perf_counter()
+            try:
+                res = await client.post("/chat", json=body, headers={"X-Request-Id": record_key(record, i)})
+                status = "ok" if res.status_code == 200 else f"http_{res.status_code}"
+            except httpx.TimeoutException:
+                status = "timeout"
+            except httpx.HTTPError:
+                status = "error"
+            finally:
+                sem.release()
+            results[i] = {
+                "ts": round(time.time(), 3),
+                "rid": record_key(record, i),
+                "message": record.get("message", ""),
+                "history": record.get("history", 0),
+                "total_ms": round((time.perf_counter() - t0) * 1000, 2),
+                "status": status,
+            }
+
+        start = time.perf_counter()
+        tasks = []
+        for i, record in enumerate(records):
+            if speed > 0:
+                due = start + (record.get("ts", ts0) - ts0) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await sem.acquire()
+            if speed > 0:
+                lags.append(max(0.0, time.perf_counter() - due))
+            tasks.append(asyncio.ensure_future(send(i, record)))
+        await asyncio.gather(*tasks)
+
+    return results, time.perf_counter() - start, lags
+
+
+def print_client_summary(results, elapsed, lags):
+    latencies = [r["total_ms"] for r in results if r["status"] == "ok"]
+    errors = len(results) - len(latencies)
+    print(f"\n📨 {len(results)} istek, {elapsed:.1f} sn, {errors} hata")
+    print(f"   istemci gecikmesi p50={percentile(latencies, 50):.1f} p90={percentile(latencies, 90):.1f} "
+          f"p99={percentile(latencies, 99):.1f} max={max(latencies, default=0.0):.1f} ms")
+    if lags and max(lags) > 0.5:
+        print(f"   ⚠️ gönderim gecikmesi en fazla {max(lags):.1f} sn (--concurrency yetmedi, tempo korunamadı)")
+
+
+def write_records(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def cmd_run(args):
+    records = load_records(args.log)[:args.limit or None]
+    if not records:
+        raise SystemExit(f"❌ Kayıt boş: {args.log}")
+    out = args.out or f"replay_{time.strftime('%Y%m%d%H%M%S')}.jsonl"
+
+    if args.url:
+        results, elapsed, lags = asyncio.run(replay(args.url, records, args.speed, args.concurrency, args.timeout))
+        print_client_summary(results, elapsed, lags)
+        write_records(out, results)
+        print(f"📝 İstemci tarafı sonuçlar yazıldı: {out} (aşama/id için sunucunun RECORD_PATH kaydını kullan)")
+        return
+
+    if os.path.exists(out):
+        os.remove(out)
+    env = dict(os.environ)
+    env.update({"RECORD_PATH": os.path.abspath(out), "RECORD_SAMPLE_RATE": "1.0"})
+    if not args.keep_cache:
+        # her oynatma soğuk önbellekle başlar; iki sürüm aynı koşulda ölçülür
+        env["CACHE_BACKEND"] = "memory"
+
+    procs = []
+    try:
+        if not args.real:
+            fake = start_process(["loadtest.fake_openai:app"], env, args.fake_port)
+            procs.append(fake)
+            wait_ready(f"http://127.0.0.1:{args.fake_port}/v1/models", fake)
+            env.update({
+                "OPENAI_API_KEY": "fake",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{args.fake_port}/v1",
+                "MILVUS_FAKE": "true",
+            })
+        app = start_process(["backend.app:app", "--workers", str(args.workers)], env, args.app_port)
+        procs.append(app)
+        base_url = f"http://127.0.0.1:{args.app_port}"
+        wait_ready(base_url + "/health", app)
+
+        results, elapsed, lags = asyncio.run(replay(base_url, records, args.speed, args.concurrency, args.timeout))
+    finally:
+        for proc in reversed(procs):
+            stop_process(proc)
+
+    print_client_summary(results, elapsed, lags)
+    print(f"📝 Yeni kayıt: {out}  ->  python -m loadtest.replay diff {args.log} {out}")
+
+
+# -----------------------
+# DIFF
+# -----------------------
+def latency_rows(pairs):
+    rows = []
+    for name in ["total"] + STAGES:
+        def pick(r):
+            return r.get("total_ms") if name == "total" else (r.get("stages") or {}).get(name)
+        a = [v for v in (pick(x) for x, _ in pairs) if v is not None]
+        b = [v for v in (pick(y) for _, y in pairs) if v is not None]
+        if not a and not b:
+            continue
+        row = {"stage": name, "n": f"{len(a)}/{len(b)}"}
+        for p in (50, 90, 99):
+            pa, pb = percentile(a, p), percentile(b, p)
+            row[f"p{p}"] = f"{pa:.1f} -> {pb:.1f}"
+            row[f"p{p}_change"] = round((pb - pa) / pa * 100, 1) if pa else None
+        rows.append(row)
+    return rows
+
+
+def format_change(change):
+    return "-" if change is None else f"{change:+.1f}%"
+
+
+def overlap(a, b):
+    if not a and not b:
+        return 1.0
+    return len(set(a) & set(b)) / max(len(a), len(b))
+
+
+def cmd_diff(args):
+    a = {record_key(r, i): r for i, r in enumerate(load_records(args.a))}
+    b = {record_key(r, i): r for i, r in enumerate(load_records(args.b))}
+    keys = [k for k in a if k in b]
+    pairs = [(a[k], b[k]) for k in keys]
+    print(f"🔗 Eşleşen: {len(keys)}   sadece A: {len(a) - len(keys)}   sadece B: {len(b) - len(keys)}")
+    if not pairs:
+        raise SystemExit("❌ Eşleşen istek yok (X-Request-Id / rid ile oynatılmış bir kayıt mı?)")
+
+    status_changes = [(k, a[k].get("status"), b[k].get("status")) for k in keys if a[k].get("status") != b[k].get("status")]
+    if status_changes:
+        print(f"⚠️ Durumu değişen: {len(status_changes)}")
+        for k, sa, sb in status_changes[:args.show]:
+            print(f"   #{k} {sa} -> {sb}: {a[k].get('message', '')[:80]}")
+
+    print("\n⏱️ Gecikme (ms, A -> B, değişim %)")
+    rows = latency_rows(pairs)
+    for row in rows:
+        print(f"   {row['stage']:<9} n={row['n']:<9} " + "  ".join(
+            f"p{p} {row['p%d' % p]} ({format_change(row['p%d_change' % p])})" for p in (50, 90, 99)
+        ))
+
+    # sadece iki tarafta da retrieval çalışmış (id'si olan) istekler
+    with_ids = [(k, x, y) for k, (x, y) in zip(keys, pairs) if x.get("ids") and y.get("ids")]
+    mean_overlap = None
+    if with_ids:
+        overlaps = sorted(((overlap(x["ids"], y["ids"]), k, x, y) for k, x, y in with_ids), key=lambda t: t[0])
+        same_order = sum(1 for _, _, x, y in overlaps if x["ids"] == y["ids"])
+        mean_overlap = sum(o for o, _, _, _ in overlaps) / len(overlaps)
+        score_delta = sum(y["scores"][0] - x["scores"][0] for _, _, x, y in overlaps if x.get("scores") and y.get("scores"))
+        print(f"\n🔎 Retrieval ({len(with_ids)} istek): aynı sıra %{same_order / len(with_ids) * 100:.1f}, "
+              f"ortalama örtüşme {mean_overlap:.3f}, en iyi skor farkı ort. {score_delta / len(with_ids):+.4f}")
+        for o, k, x, y in overlaps[:args.show]:
+            if o >= 1.0:
+                break
+            print(f"   #{k} örtüşme {o:.2f}: {x.get('message', '')[:80]}")
+            print(f"      A {x['ids']}\n      B {y['ids']}")
+    else:
+        print("\nℹ️ İki kayıtta da parça id'si olan istek yok; retrieval karşılaştırılmadı.")
+
+    failed = []
+    if args.max_regression is not None:
+        for row in rows:
+            if row["stage"] == "total":
+                for p in (50, 90):
+                    change = row[f"p{p}_change"]
+                    if change is not None and change > args.max_regression:
+                        failed.append(f"toplam p{p} %{change:+.1f} (sınır %{args.max_regression:g})")
+    if args.min_overlap is not None and mean_overlap is not None and mean_overlap < args.min_overlap:
+        failed.append(f"retrieval örtüşmesi {mean_overlap:.3f} < {args.min_overlap:g}")
+    if failed:
+        print("\n❌ Regresyon: " + "; ".join(failed))
+        sys.exit(1)
+
+
+# -----------------------
+# CLI
+# -----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="/chat trafik kaydını yeniden oynat / karşılaştır")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="kaydı yeni sürüme karşı oynat")
+    p.add_argument("log", help="RECORD_PATH ile yazılmış JSONL")
+    p.add_argument("--out", help="yeni kayıt (varsayılan replay_<zaman>.jsonl)")
+    p.add_argument("--url", help="çalışan bir servise oynat (yerel backend başlatılmaz)")
+    p.add_argument("--real", action="store_true", help="sahte OpenAI/Milvus yerine .env'deki gerçek servisler")
+    p.add_argument("--speed", type=float, default=1.0, help="tempo çarpanı (2 = iki kat hızlı, 0 = beklemeden)")
+    p.add_argument("--concurrency", type=int, default=64, help="aynı anda en fazla istek")
+    p.add_argument("--limit", type=int, default=0, help="ilk N istek (0 = hepsi)")
+    p.add_argument("--keep-cache", action="store_true", help="CACHE_BACKEND ayarını koru (varsayılan: boş bellek önbelleği)")
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--timeout", type=float, default=60.0)
+    p.add_argument("--app-port", type=int, default=8787)
+    p.add_argument("--fake-port", type=int, default=8799)
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("diff", help="iki kaydı karşılaştır (A: eski, B: yeni)")
+    p.add_argument("a")
+    p.add_argument("b")
+    p.add_argument("--show", type=int, default=10, help="listelenecek en farklı istek sayısı")
+    p.add_argument("--max-regression", type=float, help="toplam p50/p90 bu yüzdeden fazla artarsa çıkış kodu 1")
+    p.add_argument("--min-overlap", type=float, help="ortalama id örtüşmesi bunun altındaysa çıkış kodu 1")
+    p.set_defaults(func=cmd_diff)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,211 @@
+"""
+/chat için yük testi: eşzamanlılık rampası ile doyma (saturation) eğrileri.
+
+Varsayılan olarak her şeyi yerelde ayağa kaldırır:
+- loadtest/fake_openai.py (gecikmeli sahte OpenAI),
+- backend.app, MILVUS_FAKE=true ile (gecikmeli sahte Milvus), --workers ile verilen her
+  uvicorn worker sayısı için ayrı ayrı.
+Her (worker, eşzamanlılık) adımı için throughput, gecikme yüzdelikleri ve hata oranı raporlanır.
+Başlatılan backend önbelleksiz (CACHE_BACKEND=none) ve ısıtmasız çalışır: sahte koleksiyonun
+sürümü sabit, tekrarlanan sorular önbellekten gelse eğri hattı değil önbelleği ölçerdi.
+Önbellekli davranışı ölçmek için --keep-cache.
+
+Örnek:
+    python -m loadtest.run --workers 1 2 4 --concurrency 1 4 16 64 --duration 20
+    python -m loadtest.run --url http://localhost:8787 --concurrency 1 8 32   # çalışan bir servise
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_questions(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return [item["question"] for item in json.load(f)]
+        return [line.strip() for line in f if line.strip()]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    idx = min(len(s) - 1, max(0, int(round(p / 100 * (len(s) - 1)))))
+    return s[idx]
+
+
+# -----------------------
+# PROCESS MANAGEMENT
+# -----------------------
+def start_process(args, env, port):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", *args, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    return proc
+
+
+def wait_ready(url, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Süreç erken sonlandı: {url}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"Hazır olmadı: {url}")
+
+
+def stop_process(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# -----------------------
+# LOAD GENERATOR
+# -----------------------
+async def run_step(base_url, questions, concurrency, duration, warmup, history_ratio, timeout):
+    results = []  # (start, latency_s, ok)
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+
+        async def user():
+            rng = random.Random()
+            while True:
+                t0 = time.perf_counter()
+                if t0 >= deadline:
+                    return
+                q = rng.choice(questions)
+                history = []
+                if rng.random() < history_ratio:
+                    prev = rng.choice(questions)
+                    history = [{"role": "user", "content": prev}, {"role": "assistant", "content": "..."}]
+                try:
+                    res = await client.post("/chat", json={"message": q, "history": history})
+                    ok = res.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                t1 = time.perf_counter()
+                if t0 >= measure_from:
+                    results.append((t0, t1 - t0, ok))
+
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+
+    # ölçüm penceresi: son isteğin bitişine kadar (deadline sonrası tamamlananlar dahil)
+    window = max(duration, max((s + lat for s, lat, _ in results), default=deadline) - measure_from)
+    latencies_ms = [lat * 1000 for _, lat, ok in results if ok]
+    errors = sum(1 for _, _, ok in results if not ok)
+    total = len(results)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": round(len(latencies_ms) / window, 3),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 1),
+        "p90_ms": round(percentile(latencies_ms, 90), 1),
+        "p99_ms": round(percentile(latencies_ms, 99), 1),
+        "max_ms": round(max(latencies_ms, default=0.0), 1),
+    }
+
+
+def print_rows(label, rows):
+    cols = ["concurrency", "requests", "throughput_rps", "error_rate", "p50_ms", "p90_ms", "p99_ms", "max_ms"]
+    print(f"\n== {label} ==")
+    print(" ".join(c.rjust(14) for c in cols))
+    for r in rows:
+        print(" ".join(str(r[c]).rjust(14) for c in cols))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/chat yük testi")
+    parser.add_argument("--url", help="çalışan bir servise yük ver (sahte servisler başlatılmaz)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--duration", type=float, default=15.0, help="adım başına ölçüm süresi (sn)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="adım başına ısınma süresi (sn)")
+    parser.add_argument("--questions", default=os.path.join(ROOT, "eval", "retrieval_questions.json"))
+    parser.add_argument("--history-ratio", type=float, default=0.3, help="geçmiş içeren isteklerin oranı")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--app-port", type=int, default=8787)
+    parser.add_argument("--fake-port", type=int, default=8799)
+    parser.add_argument("--out", help="sonuçları JSON olarak yaz")
+    parser.add_argument("--keep-cache", action="store_true",
+                        help="CACHE_BACKEND / WARMUP ayarlarını koru (varsayılan: önbellek kapalı)")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    report = {"configs": []}
+
+    if args.url:
+        rows = [
+            asyncio.run(run_step(args.url, questions, c, args.duration, args.warmup, args.history_ratio, args.timeout))
+            for c in args.concurrency
+        ]
+        print_rows(args.url, rows)
+        report["configs"].append({"target": args.url, "steps": rows})
+    else:
+        env = dict(os.environ)
+        fake = start_process(["loadtest.fake_openai:app"], env, args.fake_port)
+        try:
+            wait_ready(f"http://127.0.0.1:{args.fake_port}/v1/models", fake)
+
+            app_env = dict(env)
+            app_env.update({
+                "OPENAI_API_KEY": "fake",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{args.fake_port}/v1",
+                "MILVUS_FAKE": "true",
+            })
+            if not args.keep_cache:
+                app_env.update({"CACHE_BACKEND": "none", "WARMUP": "false"})
+            for workers in args.workers:
+                app = start_process(["backend.app:app", "--workers", str(workers)], app_env, args.app_port)
+                try:
+                    base_url = f"http://127.0.0.1:{args.app_port}"
+                    wait_ready(base_url + "/health", app)
+                    rows = [
+                        asyncio.run(run_step(base_url, questions, c, args.duration, args.warmup,
+                                             args.history_ratio, args.timeout))
+                        for c in args.concurrency
+                    ]
+                finally:
+                    stop_process(app)
+                print_rows(f"workers={workers}", rows)
+                report["configs"].append({"workers": workers, "steps": rows})
+        finally:
+            stop_process(fake)
+
+    report["settings"] = {
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "history_ratio": args.history_ratio,
+        "fake_embed_latency_ms": os.getenv("FAKE_EMBED_LATENCY_MS", "150,0.35"),
+        "fake_chat_latency_ms": os.getenv("FAKE_CHAT_LATENCY_MS", "1800,0.5"),
+        "fake_milvus_latency_ms": os.getenv("FAKE_MILVUS_LATENCY_MS", "8,0.5"),
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print("📝 Sonuçlar yazıldı:", args.out)
+
+
+if __name__ == "__main__":
+    main()
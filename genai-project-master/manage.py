@@ -0,0 +1,308 @@
+"""
+Bakım komutları için tek giriş noktası.
+
+Ağır kütüphaneler (pymilvus, openai, pypdf ...) sadece onları kullanan alt komutta import
+edilir; `--help` anında, `stats` bir saniyenin altında döner.
+
+Örnek:
+    python manage.py stats
+    python manage.py ingest --reset
+    python manage.py ingest --blue-green --reset     # mevcut kurulumu blue/green'e bir kerelik geçirir
+    python manage.py compact --wait
+    python manage.py release rules_qa_v20260101120000
+    python manage.py rebuild-index --index-type HNSW --params '{"M": 16, "efConstruction": 200}'
+    python manage.py drop rules_qa_v20260101120000
+    python manage.py analytics --days 7
+
+Koleksiyon verilmezse MILVUS_COLLECTION / COLLECTION_NAME (ikisi verilirse aynı olmalı, varsayılan
+rules_qa) kullanılır; bu ad bir alias ise (blue/green ingest) gösterdiği koleksiyon üzerinde çalışılır.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+
+def default_collection():
+    from backend import aliases
+    return aliases.collection_setting()
+
+
+def connect():
+    from pymilvus import connections
+    connections.connect(alias="default", host=os.getenv("MILVUS_HOST", "localhost"),
+                        port=os.getenv("MILVUS_PORT", "19530"))
+
+
+def open_collection(name):
+    """Alias'ı çözer -> (Collection, gerçek ad)"""
+    from pymilvus import Collection
+    from backend import aliases
+
+    real = aliases.resolve(name)
+    if real is None:
+        raise SystemExit(f"❌ Koleksiyon bulunamadı: {name}")
+    if real != name:
+        print(f"🔗 {name} -> {real}")
+    return Collection(real), real
+
+
+def is_active(name):
+    """Blue/green alias'ının şu an gösterdiği sürüm mü? (alias'sız eski kurulumda hep False)"""
+    from backend import aliases
+    alias = default_collection()
+    real = aliases.resolve(alias)
+    return real not in (None, alias) and real == name
+
+
+# -----------------------
+# KOMUTLAR
+# -----------------------
+def cmd_ingest(args):
+    # ingest.py ayarlarını import anında okur -> önce ortam değişkenleri
+    if args.docs:
+        os.environ["DOCS_DIR"] = args.docs
+    if args.reset:
+        os.environ["RESET_COLLECTION"] = "true"
+    if args.bulk:
+        os.environ["BULK_IMPORT"] = "true"
+    if args.dry_run:
+        os.environ["DRY_RUN"] = "true"
+    if args.blue_green:
+        os.environ["BLUE_GREEN"] = "true"
+    if args.no_blue_green:
+        os.environ["BLUE_GREEN"] = "false"
+    if args.no_switch:
+        os.environ["SWITCH_ALIAS"] = "false"
+
+    import ingest
+    ingest.main()
+
+
+def cmd_drop(args):
+    from pymilvus import utility
+    from backend import aliases
+
+    name = args.collection or default_collection()
+    if not utility.has_collection(name):
+        print(f"ℹ️ Collection bulunamadı: {name}")
+        return
+
+    real = aliases.resolve(name)
+    if real != name:
+        raise SystemExit(
+            f"❌ '{name}' bir alias ({real} koleksiyonunu gösteriyor). Aktif sürüm silinmez; "
+            "eski sürümleri adıyla sil ya da önce /admin/index/switch ile başka sürüme geç."
+        )
+    if is_active(name):
+        raise SystemExit(f"❌ '{name}' şu an {default_collection()} alias'ının gösterdiği koleksiyon; silinmedi.")
+
+    if not args.yes and input(f"'{name}' silinsin mi? [e/H] ").strip().lower() not in ("e", "evet", "y", "yes"):
+        print("İptal edildi.")
+        return
+    utility.drop_collection(name)
+    print(f"✅ Collection silindi: {name}")
+
+
+def cmd_stats(args):
+    from pymilvus import utility
+    from backend import aliases
+
+    col, name = open_collection(args.collection or default_collection())
+    alias = default_collection()
+
+    print(f"📦 {name}")
+    print(f"   kayıt sayısı : {col.num_entities}")
+    print(f"   yükleme      : {utility.load_state(name).name}")
+
+    for index in col.indexes:
+        params = index.params
+        progress = utility.index_building_progress(name, index_name=index.index_name)
+        print(f"   index        : {index.field_name} {params.get('index_type')} {params.get('metric_type')} "
+              f"{json.dumps(params.get('params', {}))} "
+              f"({progress.get('indexed_rows', 0)}/{progress.get('total_rows', 0)} satır)")
+    if not col.indexes:
+        print("   index        : yok")
+
+    segments = utility.get_query_segment_info(name)
+    if segments:
+        mem = sum(getattr(s, "mem_size", 0) for s in segments)
+        rows = sum(getattr(s, "num_rows", 0) for s in segments)
+        indexed = sum(1 for s in segments if getattr(s, "index_name", ""))
+        print(f"   segment      : {len(segments)} yüklü ({indexed} index'li), {rows} satır")
+        print(f"   bellek       : {mem / 1024 / 1024:.1f} MB")
+        if args.verbose:
+            for s in segments:
+                print(f"     - {s.segmentID}: {s.num_rows} satır, {s.mem_size / 1024 / 1024:.1f} MB, "
+                      f"durum={s.state}, index={s.index_name or '-'}")
+    else:
+        print("   segment      : yüklü segment yok")
+
+    versions = aliases.list_versions(alias)
+    if versions:
+        active = aliases.resolve(alias)
+        print(f"🔀 {alias} sürümleri: " + ", ".join(v + (" (aktif)" if v == active else "") for v in versions))
+
+
+def cmd_compact(args):
+    col, name = open_collection(args.collection or default_collection())
+    t0 = time.time()
+    compaction_id = col.compact()
+    print(f"🗜️ Compaction başlatıldı: {name} (id={compaction_id})")
+    if args.wait:
+        col.wait_for_compaction_completed()
+        print(f"✅ Compaction tamamlandı ({time.time() - t0:.1f} sn): {col.get_compaction_state()}")
+
+
+def cmd_load(args):
+    col, name = open_collection(args.collection or default_collection())
+    t0 = time.time()
+    col.load()
+    print(f"✅ Yüklendi: {name} ({time.time() - t0:.1f} sn)")
+
+
+def cmd_release(args):
+    col, name = open_collection(args.collection or default_collection())
+    if is_active(name) and not args.force:
+        raise SystemExit(f"❌ '{name}' aktif sürüm; release edilirse backend arama yapamaz. --force ile zorla.")
+    col.release()
+    print(f"✅ Bellekten çıkarıldı: {name}")
+
+
+def cmd_rebuild_index(args):
+    from pymilvus import utility
+
+    col, name = open_collection(args.collection or default_collection())
+    if is_active(name) and not args.force:
+        raise SystemExit(
+            f"❌ '{name}' aktif sürüm; index yeniden kurulurken arama yapılamaz. "
+            "Yeni ayarlarla ingest edip alias'ı çevirmek kesintisizdir; yine de yapmak için --force."
+        )
+
+    field = args.field or next(
+        f.name for f in col.schema.fields if f.dtype.name in ("FLOAT_VECTOR", "FLOAT16_VECTOR")
+    )
+    index_params = {
+        "metric_type": args.metric,
+        "index_type": args.index_type.upper(),
+        "params": json.loads(args.params),
+    }
+
+    t0 = time.time()
+    col.release()
+    for index in col.indexes:
+        if index.field_name == field:
+            col.drop_index(index_name=index.index_name)
+    col.create_index(field_name=field, index_params=index_params)
+    utility.wait_for_index_building_complete(name)
+    col.load()
+    print(f"✅ Index yeniden kuruldu: {name}.{field} {json.dumps(index_params)} ({time.time() - t0:.1f} sn)")
+
+
+def cmd_analytics(args):
+    from backend import querylog
+
+    directory = args.dir or querylog.QUERY_LOG_DIR
+    if not directory:
+        raise SystemExit("❌ QUERY_LOG_DIR ayarlı değil (ya da --dir ver).")
+    entries = list(querylog.iter_entries(directory, args.days))
+    if not entries:
+        print(f"ℹ️ {directory} altında son {args.days} günde kayıt yok.")
+        return
+
+    print(f"📊 {directory}: son {args.days} gün, {len(entries)} istek\n")
+    cols = ["day", "requests", "rejected", "prefilter", "cached", "errors", "p50_ms", "p90_ms", "p99_ms"]
+    print(" ".join(c.rjust(10) for c in cols))
+    for row in querylog.daily_stats(entries):
+        print(" ".join(
+            (f"%{row[c] * 100:.1f}" if c in ("rejected", "prefilter", "cached", "errors") else str(row[c])).rjust(10)
+            for c in cols
+        ))
+
+    def show(title, rows):
+        print(f"\n{title}")
+        for r in rows:
+            score = "-" if r["best_score"] is None else f"{r['best_score']:.3f}"
+            print(f"   {r['count']:>5}  skor {score:>5}  {r['outcome'] or '-':<18} {r['question'][:90]}")
+
+    show("🔝 En sık sorular", querylog.top_questions(entries, args.top, rejected=False))
+    show("🚫 En sık reddedilenler (MIN_SCORE / ön filtre)", querylog.top_questions(entries, args.top, rejected=True))
+    print("\n🐢 En yavaş cevaplar")
+    for r in querylog.slowest_questions(entries, args.top):
+        print(f"   {r['total_ms']:>9.1f} ms  {r['day']}  {','.join(r['model'] or []):<14} {(r['question'] or '')[:80]}")
+
+
+# -----------------------
+# CLI
+# -----------------------
+def build_parser():
+    parser = argparse.ArgumentParser(description="Selçuk chatbot bakım komutları")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="DOCS_DIR'i yükle (ingest.py)")
+    p.add_argument("--docs", help="DOCS_DIR yerine bu klasör")
+    p.add_argument("--reset", action="store_true", help="RESET_COLLECTION=true")
+    p.add_argument("--bulk", action="store_true", help="BULK_IMPORT=true")
+    p.add_argument("--dry-run", action="store_true", help="sadece parse + chunk profili")
+    p.add_argument("--blue-green", action="store_true",
+                   help="yeni sürüm koleksiyonuna yaz, alias'ı çevir (BLUE_GREEN=true; ilk geçişte --reset ile)")
+    p.add_argument("--no-blue-green", action="store_true", help="yeni sürüm yerine mevcut koleksiyona yaz (varsayılan)")
+    p.add_argument("--no-switch", action="store_true", help="yeni sürümü kur ama alias'ı çevirme")
+    p.set_defaults(func=cmd_ingest, needs_milvus=False)
+
+    p = sub.add_parser("drop", help="koleksiyonu sil")
+    p.add_argument("collection", nargs="?")
+    p.add_argument("--yes", action="store_true", help="onay sorma")
+    p.set_defaults(func=cmd_drop)
+
+    p = sub.add_parser("stats", help="kayıt sayısı, segmentler, index, bellek")
+    p.add_argument("collection", nargs="?")
+    p.add_argument("-v", "--verbose", action="store_true", help="segmentleri tek tek listele")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("compact", help="silinmiş kayıtları ve küçük segmentleri birleştir")
+    p.add_argument("collection", nargs="?")
+    p.add_argument("--wait", action="store_true", help="bitmesini bekle")
+    p.set_defaults(func=cmd_compact)
+
+    p = sub.add_parser("load", help="koleksiyonu belleğe yükle")
+    p.add_argument("collection", nargs="?")
+    p.set_defaults(func=cmd_load)
+
+    p = sub.add_parser("release", help="koleksiyonu bellekten çıkar")
+    p.add_argument("collection", nargs="?")
+    p.add_argument("--force", action="store_true", help="aktif sürüm olsa da")
+    p.set_defaults(func=cmd_release)
+
+    p = sub.add_parser("rebuild-index", help="vektör index'ini yeni parametrelerle yeniden kur")
+    p.add_argument("collection", nargs="?")
+    p.add_argument("--index-type", default=os.getenv("VECTOR_INDEX", "AUTOINDEX"))
+    p.add_argument("--params", default=os.getenv("VECTOR_INDEX_PARAMS", "{}"), help="JSON, ör. '{\"nlist\": 1024}'")
+    p.add_argument("--metric", default="IP")
+    p.add_argument("--field", help="vektör alanı (varsayılan: şemadaki ilk vektör alanı)")
+    p.add_argument("--force", action="store_true", help="aktif sürüm olsa da")
+    p.set_defaults(func=cmd_rebuild_index)
+
+    p = sub.add_parser("analytics", help="sorgu günlüğü raporu (QUERY_LOG_DIR): sık/reddedilen/yavaş sorular")
+    p.add_argument("--days", type=int, default=7, help="son N gün (0 = hepsi)")
+    p.add_argument("--top", type=int, default=20)
+    p.add_argument("--dir", help="QUERY_LOG_DIR yerine bu klasör")
+    p.set_defaults(func=cmd_analytics, needs_milvus=False)
+
+    return parser
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    args = build_parser().parse_args(argv)
+
+    if getattr(args, "needs_milvus", True):
+        connect()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
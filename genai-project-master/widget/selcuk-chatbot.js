@@ -3,6 +3,12 @@
   const API_URL = "http://localhost:8787/chat"; // PROD: https://senin-domainin/chat
   const API_ORIGIN = new URL(API_URL).origin;   // ✅ http://localhost:8787
 
+  // ✅ Fakülte sayfaları için arama kapsamı: <script src="selcuk-chatbot.js" data-scope="erasmus,ders-kayit">
+  const SCRIPT_EL = document.currentScript;
+  const SCOPE = (SCRIPT_EL && SCRIPT_EL.dataset.scope)
+    ? SCRIPT_EL.dataset.scope.split(",").map(s => s.trim()).filter(Boolean)
+    : null;
+
   const launcher = document.createElement("button");
   launcher.id = "selcuk-chatbot-launcher";
   launcher.setAttribute("aria-label","Chatbot");
@@ -149,11 +155,27 @@
   // -----------------------
   // SEND MESSAGE
   // -----------------------
+  // yeni soru gelince / panel kapanınca yarım kalan istek iptal edilir (backend de işi bırakır)
+  let inflight = null;
+
+  function abortInflight(){
+    if (inflight){
+      inflight.abort();
+      inflight = null;
+    }
+  }
+
   async function send(){
     const text = (input.value || "").trim();
     if(!text) return;
 
+    abortInflight();
+    const controller = new AbortController();
+    inflight = controller;
+
     addMessage("user", text);
+    // sadece önceki turlar gönderilir; soru zaten "message" (geçmişsiz sorular önbellekten gelir)
+    const previous = history.slice();
     history.push({ role:"user", content:text });
     input.value = "";
 
@@ -163,7 +185,8 @@
       const res = await fetch(API_URL, {
         method:"POST",
         headers: { "Content-Type":"application/json" },
-        body: JSON.stringify({ message: text, history })
+        body: JSON.stringify({ message: text, history: previous, scope: SCOPE }),
+        signal: controller.signal
       });
 
       if (!res.ok) {
@@ -179,7 +202,13 @@
       history.push({ role:"assistant", content: answer });
 
     } catch(e){
+      if (e.name === "AbortError"){
+        typingEl.remove();
+        return;
+      }
       updateMessage(typingEl, "Bağlantı hatası. Daha sonra tekrar dene.");
+    } finally {
+      if (inflight === controller) inflight = null;
     }
   }
 
@@ -200,6 +229,7 @@
   });
 
   closeBtn.addEventListener("click", () => {
+    abortInflight();
     open = false;
     panel.style.display = "none";
   });